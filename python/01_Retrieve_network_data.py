@@ -57,6 +57,8 @@
 # ```
 # 
 # This notebook downloads and clips street network within 2500m radius around input data convex hull. During the extraction it plots resulting layers for visual inspection.
+# 
+# Alternatively, street network can be cut from local OpenStreetMap extract (PBF or XML, e.g. mainland Portugal from Geofabrik) set as `extract`. The extract is read only once, keeping only drivable ways (the osmnx `drive` filter) around the buffered convex hull of each case, and a graph is built for each case, so no network connection is required.
 
 # In[4]:
 
@@ -67,6 +69,10 @@ import osmnx as ox
 import matplotlib
 import matplotlib.pyplot as plt
 
+from seashore.osm import load_extract, clip_network
+from seashore.runner import Case
+from seashore.summary import case_summary
+
 
 # In[5]:
 
@@ -79,16 +85,30 @@ fiona.__version__, gpd.__version__, ox.__version__, matplotlib.__version__
 
 parts = ['atlantic', 'preatl', 'premed', 'med']
 folder = 'data/'
+extract = None  # path to local OSM extract, e.g. 'OSM/portugal-latest.osm.pbf'
 
+cases = {}
 for part in parts:
     path = folder + part + '.gpkg'
-    layers = [x for x in fiona.listlayers(path) if 'blg' in x]
-    
-    for l in layers:
-        print(l)
-        blg = gpd.read_file(path, layer=l)
-        union = gpd.GeoSeries(blg.buffer(0).unary_union.centroid, crs=blg.crs).to_crs(epsg=4326).iloc[0]
-        location_point = (union.y, union.x)
+    for l in fiona.listlayers(path):
+        if 'blg' in l:
+            cases[l] = Case(part, path, l[:-4])
+
+if extract is not None:
+    # convex hull of buildings buffered by clipping distance
+    bounds = {l: case_summary(case, by_part=False).hull.iloc[0].buffer(2500).bounds
+              for l, case in cases.items()}
+    networks = load_extract(extract, bounds)
+
+for l, case in cases.items():
+    print(l)
+    path = case.path
+    blg = gpd.read_file(path, layer=l)
+
+    if extract is None:
+        summary = case_summary(case, by_part=False)
+        centroid = gpd.GeoSeries(gpd.points_from_xy(summary.x, summary.y), crs=blg.crs).to_crs(epsg=4326).iloc[0]
+        location_point = (centroid.y, centroid.x)
 
         streets_graph = ox.graph_from_point(location_point, distance=5000, distance_type='bbox', network_type='drive')
         streets_graph = ox.project_graph(streets_graph)
@@ -98,15 +118,13 @@ for part in parts:
                                            node_geometry=False, fill_edge_geometry=True)
 
         edges = edges.to_crs(epsg=3763)
+    else:
+        edges = networks[l]
 
-        clip = blg.unary_union.convex_hull.buffer(2500)
-
-        clipped_edges = edges.intersection(clip)
-
-        clipped_edges = clipped_edges.loc[~clipped_edges.is_empty]
+    clipped_edges = clip_network(edges, blg, distance=2500)
 
-        ax = clipped_edges.plot(linewidth=0.2, figsize=(16, 16))
-        blg.plot(ax=ax, color='r')
+    ax = clipped_edges.plot(linewidth=0.2, figsize=(16, 16))
+    blg.plot(ax=ax, color='r')
 
-        clipped_edges.to_file(path, layer=l[:-3] + 'str', driver='GPKG')
+    clipped_edges.to_file(path, layer=l[:-3] + 'str', driver='GPKG')
 
@@ -67,6 +67,14 @@ import momepy as mm
 import libpysal
 import numpy as np
 
+from seashore.runner import list_cases
+from seashore.cache import StageCache, run_cached
+from seashore.measure import measure_case, fingerprint
+from seashore.gpkg import write_layers
+from seashore.store import write_store
+from seashore.features import write_features
+from seashore.instrument import write_profile, read_profiles, print_summary
+
 
 # In[2]:
 
@@ -78,113 +86,57 @@ fiona.__version__, gpd.__version__, mm.__version__, libpysal.__version__, np.__v
 
 
 folder = 'data/'
+workers = None  # number of parallel processes, None uses all cores
+tile_size = None  # tessellate large cases in tiles of this size (metres), None tessellates whole case at once
+profile_distance = 3  # distance between street profile ticks (metres), larger is faster but less precise
+profile = True  # save time and memory profile of each step to data/profile/
+
 
+# Cases are independent and measured in parallel (see `seashore/measure.py` for the code measuring a single case). Layers are saved once each case is done.
+# 
+# Tessellation of large cases can be generated in tiles (`tile_size`), which limits memory needed to the size of a tile. Cells affected by the edge of a tile are re-generated with larger overlap, so the result is the same as when tessellating whole case at once.
+# 
+# Layers are saved to GeoPackages (published data) and to the columnar store `data/store/part/name_suffix.parquet` (GeoParquet), from which following notebooks read only the columns they need. Primary characters of all elements joined to buildings (`uID`, `nID`, `bID`) are saved as a single building-level feature matrix `data/store/part/name_features.parquet` (see `seashore/features.py`).
+# 
+# Street profile is measured every `profile_distance` metres (3 m in the paper). Larger distance can be used for exploratory runs.
+# 
+# With `profile = True`, wall time, increase of peak memory and sizes of inputs of each step (tessellation, each character, blocks) are saved per case to `data/profile/part_name.csv`. Each case is then measured in a new process, so that its peak memory does not depend on cases measured before it by the same worker.
+# 
+# Each measured case is fingerprinted (geometries of `name_blg`, `name_str` and `name_case` and parameters of measurement). Cases which were not re-digitised since the last run are skipped. Remove `data/.cache` to measure all cases again.
 
 # In[ ]:
 
 
 parts = ['atlantic', 'preatl', 'premed', 'med']
 
-# Iterate through parts and layers
-for part in parts:
-    path = folder + part + '.gpkg'
-    layers = [x for x in fiona.listlayers(path) if 'blg' in x]
-    for l in layers:
-        print(l)
-        buildings = gpd.read_file(path, layer=l)
-        buildings = buildings.explode().reset_index(drop=True)  # avoid MultiPolygons
-        buildings['uID'] = mm.unique_id(buildings)
-        try:
-            buildings = buildings.drop(columns=['Buildings', 'id'])
-        except:
-            buildings = buildings[['uID', 'geometry']]
-
-        # Generate morphological tessellation
-        limit = gpd.read_file(path, layer=l[:-3] + 'case').geometry[0]
-        tess = mm.Tessellation(buildings, 'uID', limit=limit)
-        tessellation = tess.tessellation
-
-        # Measure individual characters
-        buildings['sdbAre'] = mm.Area(buildings).series
-        buildings['sdbPer'] = mm.Perimeter(buildings).series
-        buildings['ssbCCo'] = mm.CircularCompactness(buildings).series
-        buildings['ssbCor'] = mm.Corners(buildings).series
-        buildings['ssbSqu'] = mm.Squareness(buildings).series
-        buildings['ssbERI'] = mm.EquivalentRectangularIndex(buildings).series
-        buildings['ssbElo'] = mm.Elongation(buildings).series
-        buildings['ssbCCD'] = mm.CentroidCorners(buildings).mean
-        buildings['stbCeA'] = mm.CellAlignment(buildings, tessellation, 
-                                               mm.Orientation(buildings).series, 
-                                               mm.Orientation(tessellation).series, 'uID', 'uID').series
-        buildings['mtbSWR'] = mm.SharedWallsRatio(buildings, 'uID').series
-        blg_sw1 = mm.sw_high(k=1, gdf=tessellation, ids='uID')
-        buildings['mtbAli'] = mm.Alignment(buildings, blg_sw1, 'uID', mm.Orientation(buildings).series).series
-        buildings['mtbNDi'] = mm.NeighborDistance(buildings, blg_sw1, 'uID').series
-
-        tessellation['sdcLAL'] = mm.LongestAxisLength(tessellation).series
-        tessellation['sdcAre'] = mm.Area(tessellation).series
-        tessellation['sscERI'] = mm.EquivalentRectangularIndex(tessellation).series
-        tessellation['sicCAR'] = mm.AreaRatio(tessellation, buildings, 'sdcAre', 'sdbAre', 'uID').series
-
-        buildings['ldbPWL'] = mm.PerimeterWall(buildings).series
-
-        edges = gpd.read_file(path, layer=l[:-3] + 'str')
-
-        edges = edges.loc[~(edges.geom_type != "LineString")].explode().reset_index(drop=True)
-        edges = mm.network_false_nodes(edges)
-        edges['nID'] = mm.unique_id(edges)
-
-        buildings['nID'] = mm.get_network_id(buildings, edges, 'nID', min_size=100)
-
-        # merge and drop unlinked
-        tessellation = tessellation.drop(columns='nID').merge(buildings[['uID', 'nID']], on='uID')
-        tessellation = tessellation[~tessellation.isna().any(axis=1)]
-        buildings = buildings[~buildings.isna().any(axis=1)]
-
-        buildings['stbSAl'] = mm.StreetAlignment(buildings, edges, mm.Orientation(buildings).series, network_id='nID').series
-        tessellation['stcSAl'] = mm.StreetAlignment(tessellation, edges, mm.Orientation(tessellation).series, network_id='nID').series
-
-        edges['sdsLen'] = mm.Perimeter(edges).series
-        edges['sssLin'] = mm.Linearity(edges).series
-
-        profile = mm.StreetProfile(edges, buildings, distance=3)
-        edges['sdsSPW'] = profile.w
-        edges['stsOpe'] = profile.o
-        edges['svsSDe'] = profile.wd
-
-        edges['sdsAre'] = mm.Reached(edges, tessellation, 'nID', 'nID', mode='sum').series
-        edges['sdsBAr'] = mm.Reached(edges, buildings, 'nID', 'nID', mode='sum').series
-
-        edges['sisBpM'] = mm.Count(edges, buildings, 'nID', 'nID', weighted=True).series
-
-        regimes = np.ones(len(buildings))
-        block_w = libpysal.weights.block_weights(regimes, ids=buildings.uID.values)
-
-        buildings['ltcBuA'] = mm.BuildingAdjacency(buildings, block_w, 'uID').series
-
-        G = mm.gdf_to_nx(edges)
-
-        G = mm.meshedness(G, radius=5, name='meshedness')
-        mm.mean_nodes(G, 'meshedness')
-
-        edges = mm.nx_to_gdf(G, points=False)
-
-        if 'bID' in buildings.columns:
-            buildings = buildings.drop(columns='bID')
-
-        # Generate blocks
-        gen_blocks = mm.Blocks(tessellation, edges, buildings, 'bID', 'uID')
-        blocks = gen_blocks.blocks
-        buildings['bID'] = gen_blocks.buildings_id
-        tessellation['bID'] = gen_blocks.tessellation_id
-
-        blocks['ldkAre'] = mm.Area(blocks).series
-        blocks['lskElo'] = mm.Elongation(blocks).series
-        blocks['likGra'] = mm.Count(blocks, buildings, 'bID', 'bID', weighted=True).series
-
-        # Save to file
-        buildings.to_file(path, layer=l, driver='GPKG')
-        tessellation.to_file(path, layer=l[:-3] + 'tess', driver='GPKG')
-        edges.to_file(path, layer=l[:-3] + 'str', driver='GPKG')
-        blocks.to_file(path, layer=l[:-3] + 'blocks', driver='GPKG')
 
+def save(case, layers):
+    if 'profile' in layers:
+        write_profile(case, layers.pop('profile'), folder)
+    write_features(case, layers.pop('features'))
+    write_store(case, layers)
+    write_layers(case.path, {case.name + '_' + suffix: gdf for suffix, gdf in layers.items()})
+
+
+cases = list_cases(folder, parts)
+cache = StageCache('measure', folder)
+results, errors = run_cached(measure_case, cases, cache,
+                             lambda case: fingerprint(case, profile_distance, tile_size),
+                             workers=workers, callback=save, fresh=profile,
+                             tile_size=tile_size, profile_distance=profile_distance, profile=profile)
+
+
+# In[ ]:
+
+
+for case, error in errors.items():
+    print(case.name, error)
+
+
+# Summary of profiles of all measured cases (share of total time and maximal increase of peak memory of each step).
+
+# In[ ]:
+
+
+if profile:
+    print_summary(read_profiles(folder))
@@ -71,7 +71,10 @@ import momepy as mm
 import pandas as pd
 import fiona
 import inequality
-from inequality.theil import Theil
+
+from seashore.runner import list_cases
+from seashore.cache import StageCache, run_cached
+from seashore.contextual import summarise_case, fingerprint
 
 
 # In[4]:
@@ -84,77 +87,23 @@ fiona.__version__, gpd.__version__, mm.__version__, sp.__version__, np.__version
 
 
 folder = 'data/'
+workers = None  # number of parallel processes, None uses all cores
 
 
-# In[ ]:
-
-
-summative = pd.DataFrame()
-
+# Cases are summarised in parallel (see `seashore/contextual.py` for the code summarising a single case; all characters of all parts of a case are summarised at once by grouped sorting) and combined in the original order of cases. Results of cases whose layers did not change since the last run are loaded from `data/.cache`.
 
 # In[ ]:
 
 
 parts = ['atlantic', 'preatl', 'premed', 'med']
-for part in parts:
-    path = folder + part + '.gpkg'
-    layers = [x[:-4] for x in fiona.listlayers(path) if 'blg' in x]
-    for l in layers:
-        buildings = gpd.read_file(path, layer=l + '_blg')
-        edges = gpd.read_file(path, layer=l + '_str')
-        tessellation = gpd.read_file(path, layer=l + '_tess')
-        blocks = gpd.read_file(path, layer=l + '_blocks')
-
-        buildings = buildings.merge(edges.drop(columns='geometry'), on='nID', how='left')
-        buildings = buildings.merge(tessellation.drop(columns=['bID', 'geometry', 'nID']), on='uID', how='left')
-        data = buildings.merge(blocks.drop(columns='geometry'), on='bID', how='left')
-
-        to_summ = ['sdbAre', 'sdbPer', 'ssbCCo', 'ssbCor', 'ssbSqu', 'ssbERI',
-                   'ssbElo', 'ssbCCD', 'stbCeA', 'mtbSWR', 'mtbAli', 'mtbNDi', 'ldbPWL',
-                   'stbSAl', 'ltcBuA', 'sssLin', 'sdsSPW', 'stsOpe', 'svsSDe', 'sdsAre', 'sdsBAr', 'sisBpM',
-                   'sdcLAL', 'sdcAre', 'sscERI', 'sicCAR', 'stcSAl', 'ldkAre', 'lskElo', 'likGra', 'meshedness',
-                   ]
-        spec = ['sdsLen']
-
-        if 'part' in data.columns:
-            for part in set(data.part):
-                subset = data.loc[data.part == part]
-                for col in to_summ:
-                    values = subset[col]
-                    values_IQ = mm.limit_range(values, rng=(25, 75))
-                    values_ID = mm.limit_range(values, rng=(10, 90))
-
-                    summative.loc[l + str(part), col + '_meanIQ'] = np.mean(values_IQ)
-                    summative.loc[l + str(part), col + '_rangeIQ'] = sp.stats.iqr(values)
-                    summative.loc[l + str(part), col + '_TheilID'] = Theil(values_ID).T
-                for col in spec:
-                    values = subset.loc[subset.case == 1][col]
-                    values_IQ = mm.limit_range(values, rng=(25, 75))
-                    values_ID = mm.limit_range(values, rng=(10, 90))
-
-                    summative.loc[l + str(part), col + '_meanIQ'] = np.mean(values_IQ)
-                    summative.loc[l + str(part), col + '_rangeIQ'] = sp.stats.iqr(values)
-                    summative.loc[l + str(part), col + '_TheilID'] = Theil(values_ID).T
-
-        else:
-            for col in to_summ:
-                values = data[col]
-                values_IQ = mm.limit_range(values, rng=(25, 75))
-                values_ID = mm.limit_range(values, rng=(10, 90))
-
-                summative.loc[l, col + '_meanIQ'] = np.mean(values_IQ)
-                summative.loc[l, col + '_rangeIQ'] = sp.stats.iqr(values)
-                summative.loc[l, col + '_TheilID'] = Theil(values_ID).T
-
-            for col in spec:
-                values = data.loc[data.case == 1][col]
-                values_IQ = mm.limit_range(values, rng=(25, 75))
-                values_ID = mm.limit_range(values, rng=(10, 90))
-
-                summative.loc[l, col + '_meanIQ'] = np.mean(values_IQ)
-                summative.loc[l, col + '_rangeIQ'] = sp.stats.iqr(values)
-                summative.loc[l, col + '_TheilID'] = Theil(values_ID).T
-            
+cases = list_cases(folder, parts)
+cache = StageCache('contextual', folder)
+results, errors = run_cached(summarise_case, cases, cache, fingerprint, store=True, workers=workers)
+
+for case, error in errors.items():
+    print(case.name, error)
+
+summative = pd.concat(results.values(), sort=False)
 
 
 # In[ ]:
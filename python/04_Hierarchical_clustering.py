@@ -18,12 +18,15 @@
 
 import matplotlib
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import sklearn
 from sklearn import preprocessing
 import scipy as sp
 from scipy.cluster import hierarchy
 
+from seashore.linkage import cached_linkage, cut_levels
+
 
 # In[19]:
 
@@ -63,11 +66,22 @@ data.to_csv('data/summative_data_norm.csv')
 
 
 # ## Clustering
+# 
+# Linkage is stored in `data/.cache/linkage/` under the hash of standardized data and recomputed only if the data change.
 
 # In[17]:
 
 
-Z = hierarchy.linkage(data, 'ward')
+Z = cached_linkage(data, 'ward')
+
+
+# Clusters and their silhouette and Calinski-Harabasz scores for a range of cut levels.
+
+# In[ ]:
+
+
+labels, scores = cut_levels(Z, data, thresholds=np.arange(10, 31))
+scores
 
 
 # In[18]:
@@ -87,22 +101,16 @@ dn = hierarchy.dendrogram(Z, labels=data.index, orientation='right',
 folder = 'data/'
 parts = ['atlantic', 'preatl', 'premed', 'med']
 
+# centroids of buildings of cases (and their parts) are computed from coordinates and cached
+from seashore.runner import list_cases
+from seashore.summary import case_summary
+
 c_parts = []
 geoms = []
-for part in parts:
-    path = folder + part + '.gpkg'
-    layers = [x[:-4] for x in fiona.listlayers(path) if 'blg' in x]
-    for l in layers:
-        buildings = gpd.read_file(path, layer=l + '_blg')
-        
-        if 'part' in buildings.columns:
-            for bpart in set(buildings.part):
-                subset = buildings.loc[buildings.part == bpart]
-                geoms.append(subset.geometry.unary_union.centroid)
-                c_parts.append(part)
-        else:
-            geoms.append(buildings.geometry.unary_union.centroid)
-            c_parts.append(part)
+for case in list_cases(folder, parts):
+    summary = case_summary(case, by_part=True)
+    geoms += list(gpd.points_from_xy(summary.x, summary.y))
+    c_parts += [case.part] * len(summary)
 
 
 # In[ ]:
@@ -115,7 +123,8 @@ gdf['part'] = c_parts
 # In[ ]:
 
 
-gdf['cl'] = hierarchy.fcluster(Z, 18, criterion='distance')
+threshold = 18
+gdf['cl'] = labels[threshold].values
 gdf['cl'] = gdf.cl.replace(8, 7)
 gdf['cl'] = gdf.cl.replace(2, 3)
 
@@ -125,3 +134,36 @@ gdf['cl'] = gdf.cl.replace(2, 3)
 
 gdf.reset_index().to_file('data/points.gpkg', driver='GPKG', layer='ward')
 
+
+# ## Stability of clusters
+# 
+# Cases are clustered again 1000 times, each time using a bootstrap sample of cases described by a random subset of 80 % of characters (see `seashore/stability.py`). Stability of a case is the mean agreement of its co-assignment with other cases with clusters in the `ward` layer.
+
+# In[ ]:
+
+
+from seashore.stability import bootstrap_stability
+
+coassignment, stability = bootstrap_stability(data, gdf.cl, n_boot=1000, features=0.8)
+stability.sort_values()
+
+
+
+# ## Building-level clustering
+# 
+# Buildings of all cases are clustered based on their primary characters (feature matrix stored by `02_Measure_morphometric_characters.ipynb`). Full Ward's linkage of all buildings does not fit memory, so buildings are grouped into micro-clusters by mini-batch k-means fitted chunk by chunk, which are then clustered using Ward's method (see `seashore/clustering.py`). Labels of buildings are stored in `data/store/part/name_clusters.parquet`. Cases are then clustered based on the share of their buildings in each cluster.
+
+# In[ ]:
+
+
+from seashore.clustering import cluster_buildings
+
+cases = list_cases(folder, parts)
+composition, Z_blg = cluster_buildings(cases, n_clusters=10, k=200)
+
+
+# In[ ]:
+
+
+plt.figure(figsize=(10, 25))
+dn = hierarchy.dendrogram(Z_blg, labels=composition.index, orientation='right')
@@ -11,7 +11,11 @@
 # 
 # This notebooks models floor risk under "what if" +5 m scenario based on digital terrain model on Portuguese coast provided by Direção-Geral do Território (DGT) - `Modelo Digital do Terreno das Zonas Costeiras de Portugal Continental com resolução de 1 m (400 m em terra) - LiDAR, 2011-12-07`. Unfortunately, we do not hold rights to share the data within this repository.
 # 
-# DTM data are stored in separate ASC files based on the grid defined in `MDT1m_LiDAR2011_secciona.shp`.
+# DTM data are stored in separate ASC files based on the grid defined in `MDT1m_LiDAR2011_secciona.shp`. The grid is used as an index: only windows of tiles covering blocks of buildings of each case are read (see `seashore/flood.py`).
+# 
+# Optionally, histograms of elevation within buildings (0.1 m bins) are stored next to the `_blg` layers in `data/store/` (see `seashore/elevation.py`). Shares of footprints below any level or quantiles of elevation can be then computed without reading the DTM again.
+# 
+# ASC files are converted once to tiled, compressed GeoTIFFs stored in `MDT/cache/` (see `seashore/dtm.py`), which are read instead. A tile is converted again only when its ASC file changes.
 # 
 # 
 # `name_tess` layers require additional attribute `main` to be set to 1 for cells in the first row. Note that this information was not used in the final manuscript.
@@ -73,12 +77,22 @@
 
 import geopandas as gpd
 import rasterio as rio
-from rasterio.merge import merge
 import rasterstats
 import pandas as pd
 import numpy as np
 import fiona
 
+from seashore.runner import list_cases, run_cases
+from seashore.cache import StageCache, run_cached
+from seashore.flood import zonal_case, fingerprint
+from seashore.gpkg import add_columns
+from seashore.dtm import build_cache
+from seashore.elevation import write_histogram
+from seashore.waterrelation import write_waterrelation
+from seashore.sealevel import LEVELS, sweep_case
+from seashore.inundation import inundation_case
+from seashore.inundation import fingerprint as inundation_fingerprint
+
 
 # In[2]:
 
@@ -92,6 +106,13 @@ fiona.__version__, gpd.__version__, rio.__version__, rasterstats.__version__, np
 grid = gpd.read_file('MDT/MDT1m_LiDAR2011_secciona.shp')
 
 
+# In[175]:
+
+
+# one-time conversion of ASC tiles to GeoTIFF, fresh tiles are skipped
+build_cache(grid.Id_Unidade, 'MDT/')
+
+
 # In[197]:
 
 
@@ -101,97 +122,67 @@ folder = '/Users/martin/Dropbox/Academia/Data/Geo/Portugal/'
 # In[201]:
 
 
+workers = None  # number of parallel processes, None uses all cores
 parts = ['atlantic', 'preatl', 'premed', 'med']
-for part in parts:
-    path = folder + part + '.gpkg'
-    layers = [x[:-4] for x in fiona.listlayers(path) if 'blg' in x]
-    for l in layers:
-        blg = gpd.read_file(path, layer=l + '_blg')
-        case = gpd.read_file(path, layer=l + '_case')
-        
-        rparts = grid[grid.intersects(case.unary_union)].Id_Unidade
-        rasters = []
-        for rpart in rparts:
-            rpath = 'MDT/' + rpart + '-top_orto.asc'
-            rasters.append(rio.open(rpath))
-        if len(rasters) > 1:
-            array, affine = merge(rasters)
-            stats = rasterstats.zonal_stats(blg, array[0], affine=affine, stats=['min', 'max', 'median', 'mean', 'count'])
-        else:
-            stats = rasterstats.zonal_stats(blg, rasters[0].read(1), affine=rasters[0].transform, stats=['min', 'max', 'median', 'mean', 'count'])
-        if 'min' in blg.columns:
-            blg = blg.drop(columns=['min', 'max', 'median', 'mean', 'count'])
-        blg = blg.join(pd.DataFrame(stats))
-        blg.to_file(path, layer=l + '_blg', driver='GPKG')
-        print(part, l, 'done')
-
-
-# In[210]:
+histogram = 0.1  # width of bins of stored histograms of elevation (m), None does not store them
 
 
-parts = ['atlantic', 'preatl', 'premed', 'med']
-for part in parts:
-    path = folder + part + '.gpkg'
-    layers = [x[:-4] for x in fiona.listlayers(path) if 'blg' in x]
-    for l in layers:
-        blg = gpd.read_file(path, layer=l + '_blg')
-        blg = blg.replace(-999, np.nan)
-        print(part, l, '- NaN in min:', blg['min'].isna().sum(), '/', len(blg))
+def save(case, result):
+    if histogram is not None:
+        result, bins = result
+        write_histogram(case, bins, histogram)
+    # only attribute columns are updated, geometries are not rewritten
+    add_columns(case.path, case.name + '_blg', result, key='uID')
 
 
-# In[213]:
+cases = list_cases(folder, parts)
+cache = StageCache('flood', folder)
+results, errors = run_cached(zonal_case, cases, cache,
+                             lambda case: fingerprint(case, grid, histogram=histogram),
+                             workers=workers, callback=save, grid=grid, histogram=histogram)
 
+for case, error in errors.items():
+    print(case.name, error)
 
-parts = ['atlantic', 'preatl', 'premed', 'med']
-for part in parts:
-    path = folder + part + '.gpkg'
-    layers = [x[:-4] for x in fiona.listlayers(path) if 'blg' in x]
-    for l in layers:
-        blg = gpd.read_file(path, layer=l + '_blg')
-        blg = blg.replace(-999, np.nan)
-        print(part, l, (blg['min']< 5).sum(), (blg['min']< 5).sum() / len(blg))
 
+# Attributes of buildings and tessellation cells of each case are read once (without geometry). Number of buildings without elevation and below 5 m is printed and rows of flood risk data are appended to `waterrelation_data.csv` case by case (see `seashore/waterrelation.py`).
 
-# In[249]:
+# In[251]:
 
 
-waterrelation = pd.DataFrame()
+write_waterrelation(cases, 'data/waterrelation_data.csv', level=5)
 
 
-# In[251]:
+# Flood risk above is based on a single +5 m scenario. Shares of flooded buildings, their footprint area and buildings in the first row (`main`) are computed for a range of sea levels (0.5-10 m by 0.1 m) from minimal elevation of buildings.
 
+# In[254]:
 
-parts = ['atlantic', 'preatl', 'premed', 'med']
-for part in parts:
-    path = folder + part + '.gpkg'
-    layers = [x[:-4] for x in fiona.listlayers(path) if 'blg' in x]
-    for l in layers:
-        buildings = gpd.read_file(path, layer=l + '_blg')
-        tessellation = gpd.read_file(path, layer=l + '_tess')
-        
-        buildings = buildings.merge(tessellation[['uID', 'main']], on='uID', how='left')
-        if 'main' not in buildings.columns:
-            import warnings
-            warnings.warn(l)
-        main = buildings[buildings['main'] == 1]
-        
-        if 'part' in main.columns:
-            for part in set(main.part):
-                subset = main.loc[main.part == part]
-                mainset = buildings.loc[buildings.part == part]
-                
-                waterrelation.loc[l + str(part), 'min' + '_min'] = subset['min'].min()
-                waterrelation.loc[l + str(part), 'min' + '_med'] = subset['min'].median()   
-                waterrelation.loc[l + str(part), 'flooded_perc'] = (mainset['min']< 5).sum() / len(mainset)
-    
-        else:
-            waterrelation.loc[l, 'min' + '_min'] = main['min'].min()
-            waterrelation.loc[l, 'min' + '_med'] = main['min'].median()  
-            waterrelation.loc[l, 'flooded_perc'] = (buildings['min']< 5).sum() / len(buildings)
-
-
-# In[253]:
-
-
-waterrelation.to_csv('data/waterrelation_data.csv')
+
+sealevel = pd.concat([sweep_case(case, LEVELS) for case in cases], ignore_index=True)
+sealevel.to_csv('data/sealevel_data.csv', index=False)
+
+
+# The bathtub model above floods also depressions not connected to the sea. Connected model floods DTM from the sea and stores the level at which each building gets flooded as `min_conn`. The sea is given explicitly as OSM water polygons (split, EPSG:4326, https://osmdata.openstreetmap.de/data/water-polygons.html) reprojected to the CRS of DTM. Cases are measured again only once their buildings, DTM tiles or the sea around them change.
+
+# In[255]:
+
+
+def save_connected(case, levels):
+    add_columns(case.path, case.name + '_blg', levels, key='uID')
+
+
+sea = gpd.read_file('data/water-polygons-split-4326/water_polygons.shp',
+                    bbox=tuple(grid.to_crs(epsg=4326).total_bounds)).to_crs(grid.crs)
+sea.sindex  # spatial index built once for fingerprints of all cases
+
+cache = StageCache('inundation', folder)
+results, errors = run_cached(inundation_case, cases, cache,
+                             lambda case: inundation_fingerprint(case, grid, sea),
+                             workers=workers, callback=save_connected, grid=grid, sea=sea)
+
+for case, error in errors.items():
+    print(case.name, error)
+
+connected = pd.concat([sweep_case(case, LEVELS, column='min_conn') for case in cases], ignore_index=True)
+connected.to_csv('data/sealevel_connected_data.csv', index=False)
 
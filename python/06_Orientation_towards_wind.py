@@ -81,44 +81,32 @@ fiona.__version__, gpd.__version__, shapely.__version__, np.__version__, pd.__ve
 
 from shapely.ops import linemerge
 
-def wind_issue(line, wind_angle=45):
-    coords = line.coords
-    angle = np.arctan2(coords[-1][0] - coords[0][0], coords[-1][1] - coords[0][1])
-    az = np.degrees(angle)
-    
-    if az < wind_angle:
-        az += 180
-    az -= wind_angle
-    if az < 0:
-        az = az * -1
-    if 90 < az <= 180:
-        diff = az - 90
-        az = az - 2 * diff
-    return az / 90
-
-
-wind = pd.DataFrame(columns=['place', 'winddev'])
-ix = 0
-
-parts = ['atlantic', 'preatl', 'premed', 'med']
-
-for part in parts:
-    path = folder + part + '.gpkg'
-    layers = [x[:-4] for x in fiona.listlayers(path) if 'blg' in x]
-    for l in layers:
-        streets = gpd.read_file(path, layer=l + '_str')
-        seashore = streets[streets.case == 1].geometry.to_list()
-        merged = linemerge(seashore)
-        if merged.type != 'LineString':
-            dims = {}
-            for i, seg in enumerate(merged):
-                dims[i] = seg.length
-            key = max(dims, key=dims.get)
-            wind.loc[ix] = [l, wind_issue(merged[key])]
-            ix += 1
-        else:
-            wind.loc[ix] = [l, wind_issue(merged)]
-            ix += 1
+from seashore.orientation import DIRECTIONS, azimuth, deviation, wind_exposure
+from seashore.runner import list_cases
+
+folder = 'data/'
+cases = list_cases(folder)
+
+
+# Deviation of the longest merged seashore street from SW wind (45 degrees). End points of all cases are collected first and their deviation computed at once.
+
+# In[ ]:
+
+
+places = []
+ends = []
+
+for case in cases:
+    streets = gpd.read_file(case.path, layer=case.name + '_str')
+    seashore = streets[streets.case == 1].geometry.to_list()
+    merged = linemerge(seashore)
+    if merged.type != 'LineString':
+        merged = max(merged, key=lambda seg: seg.length)
+    places.append(case.name)
+    ends.append(merged.coords[0][:2] + merged.coords[-1][:2])
+
+x0, y0, x1, y1 = np.asarray(ends).T
+wind = pd.DataFrame({'place': places, 'winddev': deviation(azimuth(x0, y0, x1, y1), [45])[:, 0]})
 
 
 # In[ ]:
@@ -126,3 +114,12 @@ for part in parts:
 
 wind.to_csv(folder + 'wind_relation.csv')
 
+
+# Length-weighted deviation of all segments of seashore streets from each direction of 16-point wind rose. `rose` is the mean deviation weighted by frequency of directions (equal if `frequencies` is None).
+
+# In[ ]:
+
+
+frequencies = None
+exposure = wind_exposure(cases, DIRECTIONS, frequencies)
+exposure.to_csv(folder + 'wind_exposure.csv')
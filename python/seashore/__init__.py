@@ -0,0 +1,7 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Helper modules shared by the computational notebooks of Climate adaptation plans
+in the context of coastal settlements: the case of Portugal.
+"""
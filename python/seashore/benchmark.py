@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# benchmark.py
+# throughput and scaling of stages on synthetic cases
+
+import argparse
+import datetime
+import os
+import platform
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .clustering import cluster_buildings
+from .contextual import summarise_case
+from .features import write_features
+from .flood import zonal_case
+from .gpkg import write_layers
+from .instrument import _peak_rss
+from .measure import measure_case
+from .store import write_store
+from .synthetic import mark_seashore, synthetic_case
+
+__all__ = ["SIZES", "STAGES", "run_benchmark", "scaling"]
+
+SIZES = [1000, 10000, 100000, 500000]
+STAGES = ["tessellation", "primary", "write", "contextual", "zonal", "clustering"]
+
+
+def _commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _timed(func, *args, **kwargs):
+    rss = _peak_rss()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start, _peak_rss() - rss
+
+
+def _bench_case(folder, n, seed):
+    """
+    Run all stages on a synthetic case of ``n`` buildings.
+
+    ``case`` of seashore streets is assigned to saved edges before contextual
+    characters, as it is in real data (see
+    :func:`~seashore.synthetic.mark_seashore`). Clustering runs on all ``n``
+    buildings (see :func:`~seashore.clustering.cluster_buildings`).
+    """
+    case, grid = synthetic_case(folder, n, seed=seed)
+    timings = {}
+
+    layers, seconds, rss = _timed(measure_case, case, profile=True)
+    profile = layers.pop("profile")
+    features = layers.pop("features")
+    # increases of peak RSS of steps add up to the increase of the whole call
+    step = profile.loc[profile.step == "Tessellation", ["seconds", "peak_rss_delta"]].sum()
+    timings["tessellation"] = (step.seconds, int(step.peak_rss_delta))
+    timings["primary"] = (seconds - step.seconds, rss - int(step.peak_rss_delta))
+
+    def _write(layers):
+        write_store(case, layers)
+        write_features(case, features)
+        write_layers(case.path, {case.name + "_" + s: gdf for s, gdf in layers.items()})
+
+    _, seconds, rss = _timed(_write, layers)
+    timings["write"] = (seconds, rss)
+    mark_seashore(case)
+
+    _, seconds, rss = _timed(summarise_case, case)
+    timings["contextual"] = (seconds, rss)
+
+    _, seconds, rss = _timed(zonal_case, case, grid, mdt=os.path.join(folder, "MDT", ""))
+    timings["zonal"] = (seconds, rss)
+
+    _, seconds, rss = _timed(cluster_buildings, [case])
+    timings["clustering"] = (seconds, rss)
+    return timings
+
+
+def run_benchmark(folder="bench/", sizes=SIZES, seed=0, output=None):
+    """
+    Run stages on synthetic cases of increasing size.
+
+    Each size is generated with the same ``seed``, so results of different
+    commits are measured on identical data. Each size runs in a fresh
+    process, so increase of peak RSS does not depend on previous sizes. Each
+    record holds the commit, the size, wall time, throughput (buildings per
+    second) and increase of peak RSS of a stage.
+
+    Parameters
+    ----------
+    folder : str (default 'bench/')
+        folder for synthetic data
+    sizes : list (default SIZES)
+        numbers of buildings
+    seed : int (default 0)
+        seed of synthetic data
+    output : str (default None)
+        CSV file to append records to
+
+    Returns
+    -------
+    DataFrame
+        benchmark records
+    """
+    commit = _commit()
+    stamp = datetime.datetime.now().isoformat(timespec="seconds")
+    records = []
+    for n in sizes:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            timings = executor.submit(_bench_case, folder, n, seed).result()
+        for stage, (seconds, rss) in timings.items():
+            records.append(
+                {
+                    "commit": commit,
+                    "timestamp": stamp,
+                    "machine": platform.node(),
+                    "stage": stage,
+                    "buildings": n,
+                    "seconds": seconds,
+                    "throughput": n / seconds if seconds else np.nan,
+                    "peak_rss_delta": rss,
+                }
+            )
+            print(n, stage, "{:.2f} s".format(seconds))
+
+    records = pd.DataFrame(records)
+    if output is not None:
+        records.to_csv(output, mode="a", index=False, header=not os.path.exists(output))
+    return records
+
+
+def scaling(records):
+    """
+    Scaling curves of stages.
+
+    Parameters
+    ----------
+    records : DataFrame
+        records as returned by :func:`run_benchmark` (or read from its output)
+
+    Returns
+    -------
+    DataFrame
+        seconds per stage (rows) and size (columns) and the exponent ``k`` of
+        fitted ``seconds ~ buildings ** k`` (1 is linear scaling)
+    """
+    table = records.pivot_table(index="stage", columns="buildings", values="seconds")
+    sizes = np.log(table.columns.values.astype(float))
+
+    def _exponent(row):
+        valid = row.values > 0
+        if valid.sum() < 2:
+            return np.nan
+        return np.polyfit(sizes[valid], np.log(row.values[valid]), 1)[0]
+
+    table["k"] = table.apply(_exponent, axis=1)
+    return table.reindex([s for s in STAGES if s in table.index])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stages on synthetic cases.")
+    parser.add_argument("--folder", default="bench/", help="folder for synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench/results.csv", help="CSV to append to")
+    args = parser.parse_args()
+
+    records = run_benchmark(args.folder, args.sizes, args.seed, args.output)
+    print(scaling(records))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# cache.py
+# content-hashed cache of per-case stages
+
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+
+from .runner import run_cases
+
+__all__ = ["layer_fingerprint", "case_fingerprint", "StageCache", "run_cached"]
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def layer_fingerprint(path, layer, subset=None):
+    """
+    Hash the content of a GeoPackage layer.
+
+    Raw rows are read directly from the underlying SQLite table, so geometries
+    are not parsed. Fingerprint changes whenever any of the hashed values
+    changes.
+
+    Parameters
+    ----------
+    path : str
+        path to GeoPackage
+    layer : str
+        name of the layer
+    subset : str or list (default None)
+        hash only ``'geometry'``, only ``'attributes'`` or only listed columns
+        (missing columns are skipped). None hashes all columns.
+
+    Returns
+    -------
+    str
+        hexadecimal SHA-1 digest or None if layer does not exist
+    """
+    uri = "file:{}?mode=ro".format(path)
+    with sqlite3.connect(uri, uri=True) as con:
+        exists = con.execute(
+            "SELECT count(*) FROM gpkg_contents WHERE table_name = ?", (layer,)
+        ).fetchone()[0]
+        if not exists:
+            return None
+
+        info = con.execute("PRAGMA table_info({})".format(_quote(layer))).fetchall()
+        pk = [row[1] for row in info if row[5]]
+        geometry = con.execute(
+            "SELECT column_name FROM gpkg_geometry_columns WHERE table_name = ?",
+            (layer,),
+        ).fetchone()
+        geometry = geometry[0] if geometry else None
+
+        columns = [row[1] for row in info if not row[5]]
+        if subset == "geometry":
+            columns = [c for c in columns if c == geometry]
+        elif subset == "attributes":
+            columns = [c for c in columns if c != geometry]
+        elif subset is not None:
+            columns = [c for c in columns if c in subset]
+
+        sha = hashlib.sha1(repr(columns).encode())
+        if columns:
+            query = "SELECT {} FROM {}".format(
+                ", ".join(_quote(c) for c in columns), _quote(layer)
+            )
+            if pk:
+                query += " ORDER BY {}".format(_quote(pk[0]))
+            for row in con.execute(query):
+                sha.update(repr(row).encode())
+
+    return sha.hexdigest()
+
+
+def case_fingerprint(case, suffixes, params=None, subset=None):
+    """
+    Combine fingerprints of case layers and parameters of a stage.
+
+    Parameters
+    ----------
+    case : Case
+        case to be hashed
+    suffixes : list
+        suffixes of hashed layers (e.g. ``['blg', 'str']``)
+    params : dict (default None)
+        parameters of a stage influencing its results
+    subset : str (default None)
+        passed to :func:`layer_fingerprint`
+
+    Returns
+    -------
+    str
+        hexadecimal SHA-1 digest
+    """
+    sha = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode())
+    for suffix in suffixes:
+        fingerprint = layer_fingerprint(case.path, case.name + "_" + suffix, subset)
+        sha.update("{}:{};".format(suffix, fingerprint).encode())
+    return sha.hexdigest()
+
+
+class StageCache:
+    """
+    Fingerprints (and optionally results) of cases processed by a stage.
+
+    Fingerprints are stored in ``folder/.cache/stage/manifest.json``, results
+    are pickled next to it.
+
+    Parameters
+    ----------
+    stage : str
+        name of the stage
+    folder : str (default 'data/')
+        folder containing GeoPackages
+
+    Attributes
+    ----------
+    fingerprints : dict
+        fingerprints keyed by ``part/name``
+    """
+
+    def __init__(self, stage, folder="data/"):
+        self.directory = os.path.join(folder, ".cache", stage)
+        self.manifest = os.path.join(self.directory, "manifest.json")
+        if os.path.exists(self.manifest):
+            with open(self.manifest) as f:
+                self.fingerprints = json.load(f)
+        else:
+            self.fingerprints = {}
+
+    @staticmethod
+    def _key(case):
+        return case.part + "/" + case.name
+
+    def _result_path(self, case):
+        return os.path.join(self.directory, case.part + "_" + case.name + ".pickle")
+
+    def fresh(self, case, fingerprint):
+        """Check whether case was processed with the same fingerprint."""
+        return self.fingerprints.get(self._key(case)) == fingerprint
+
+    def update(self, case, fingerprint, result=None):
+        """Record fingerprint (and result) of processed case."""
+        os.makedirs(self.directory, exist_ok=True)
+        if result is not None:
+            with open(self._result_path(case), "wb") as f:
+                pickle.dump(result, f)
+        self.fingerprints[self._key(case)] = fingerprint
+
+        tmp = self.manifest + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.fingerprints, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.manifest)
+
+    def load(self, case):
+        """Load stored result of a case."""
+        with open(self._result_path(case), "rb") as f:
+            return pickle.load(f)
+
+
+def run_cached(
+    func, cases, cache, fingerprint, store=False, workers=None, callback=None, fresh=False,
+    **kwargs
+):
+    """
+    Run :func:`~seashore.runner.run_cases` only for cases which have changed.
+
+    Case is skipped if its current fingerprint matches the one recorded after
+    its previous run. Fingerprint is recorded after ``callback`` saved the
+    results, so it reflects the state of layers as left by the stage. As
+    downstream stages hash the layers written by upstream stages, a recomputed
+    case is invalidated in the following stages as well, while untouched
+    cases keep identical content and remain cached.
+
+    Parameters
+    ----------
+    func : callable
+        function processing a single case
+    cases : list
+        list of :class:`~seashore.runner.Case`
+    cache : StageCache
+        cache of the stage
+    fingerprint : callable
+        function returning fingerprint of a case
+    store : bool (default False)
+        store results in the cache and return them also for skipped cases
+    workers : int (default None)
+        number of worker processes
+    callback : callable (default None)
+        function called as ``callback(case, result)`` once a case is done
+    fresh : bool (default False)
+        run each case in a new worker process (see
+        :func:`~seashore.runner.run_cases`)
+    **kwargs
+        keyword arguments passed to ``func``
+
+    Returns
+    -------
+    results : dict
+        results keyed by case, ordered as ``cases``. Skipped cases are included
+        only if ``store=True``.
+    errors : dict
+        formatted tracebacks of failed cases
+    """
+    todo = [case for case in cases if not cache.fresh(case, fingerprint(case))]
+    print(len(cases) - len(todo), "of", len(cases), "cases unchanged")
+
+    def _callback(case, result):
+        if callback is not None:
+            result = callback(case, result)
+        cache.update(case, fingerprint(case), result if store else None)
+        return result
+
+    results, errors = run_cases(
+        func, todo, workers=workers, callback=_callback, fresh=fresh, **kwargs
+    )
+
+    if store:
+        results = {
+            case: results[case] if case in results else cache.load(case)
+            for case in cases
+            if case not in errors
+        }
+    return results, errors
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# clustering.py
+# building-level clustering across cases, fitted chunk by chunk
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy.cluster import hierarchy
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+
+from .features import CHARACTERS, read_features
+from .store import store_path
+
+__all__ = ["COLUMNS", "cluster_buildings", "read_clusters"]
+
+# primary characters of all elements joined to buildings
+COLUMNS = [c for chars in CHARACTERS.values() for c in chars]
+
+
+def _read(cases, columns):
+    """Yield case, its features and character matrix, one case at a time."""
+    for case in cases:
+        features = read_features(case, ['uID', 'part'] + columns)
+        missing = [c for c in columns if c not in features.columns]
+        if missing:
+            raise ValueError("{}: characters {} are not available.".format(case.name, missing))
+        matrix = np.ascontiguousarray(features[columns].values, dtype=np.float64)
+        matrix[~np.isfinite(matrix)] = np.nan
+        yield case, features, matrix
+
+
+def _batches(matrix, batch_size):
+    for start in range(0, len(matrix), batch_size):
+        yield matrix[start:start + batch_size]
+
+
+def _standardize(scaler, matrix):
+    # missing characters are set to the mean
+    return np.nan_to_num(scaler.transform(matrix), nan=0.0)
+
+
+def _write_clusters(case, clusters):
+    path = store_path(case, "clusters")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    pq.write_table(pa.Table.from_pandas(clusters, preserve_index=False), tmp)
+    os.replace(tmp, path)
+
+
+def cluster_buildings(
+    cases,
+    columns=COLUMNS,
+    n_clusters=10,
+    k=200,
+    batch_size=10000,
+    random_state=0,
+):
+    """
+    Cluster buildings of all cases and their cases based on the clusters.
+
+    Full Ward's linkage of hundreds of thousands of buildings does not fit
+    memory, so buildings are first grouped into ``k`` micro-clusters by
+    mini-batch k-means, which are then clustered using Ward's
+    method into ``n_clusters`` clusters. Feature matrix of buildings (see
+    :func:`~seashore.features.read_features`) is read case by case and
+    processed in chunks of ``batch_size`` rows in three passes: characters
+    are standardized, micro-clusters are fitted, buildings are labelled.
+    Only a single case is in memory at once.
+
+    Labels of buildings are stored as ``data/store/part/name_clusters.parquet``.
+    Cases (and their parts) are described by the share of their buildings in
+    each cluster and clustered using Ward's method.
+
+    Parameters
+    ----------
+    cases : list
+        list of :class:`~seashore.runner.Case`
+    columns : list (default COLUMNS)
+        characters used for clustering
+    n_clusters : int (default 10)
+        number of clusters of buildings
+    k : int (default 200)
+        number of micro-clusters of k-means, at most the number of buildings
+    batch_size : int (default 10000)
+        number of buildings in a chunk
+    random_state : int (default 0)
+        random state of k-means
+
+    Returns
+    -------
+    composition : DataFrame
+        share of buildings in each cluster indexed by case (and part)
+    linkage : ndarray
+        Ward's linkage matrix of cases (rows of ``composition``), empty if
+        there are less than two rows
+
+    Examples
+    --------
+    >>> composition, Z = cluster_buildings(list_cases('data/'), n_clusters=10)
+    >>> dn = hierarchy.dendrogram(Z, labels=composition.index)
+    """
+    columns = list(columns)
+
+    scaler = StandardScaler()
+    rows = 0
+    for _, _, matrix in _read(cases, columns):
+        rows += len(matrix)
+        for batch in _batches(matrix, batch_size):
+            scaler.partial_fit(batch)
+
+    k = min(k, rows)
+    if k < n_clusters:
+        raise ValueError(
+            "{} buildings can't be clustered into {} clusters.".format(rows, n_clusters))
+
+    model = MiniBatchKMeans(n_clusters=k, batch_size=batch_size, random_state=random_state)
+    # the first batch of k-means has to contain at least k rows
+    buffer = []
+    for _, _, matrix in _read(cases, columns):
+        for batch in _batches(matrix, batch_size):
+            buffer.append(_standardize(scaler, batch))
+            if sum(len(b) for b in buffer) >= k:
+                model.partial_fit(np.concatenate(buffer))
+                buffer = []
+    if buffer:
+        model.partial_fit(np.concatenate(buffer))
+
+    Z = hierarchy.linkage(model.cluster_centers_, 'ward')
+    ward = hierarchy.fcluster(Z, n_clusters, criterion='maxclust')
+
+    counts = []
+    for case, features, matrix in _read(cases, columns):
+        micro = np.concatenate([model.predict(_standardize(scaler, batch))
+                                for batch in _batches(matrix, batch_size)])
+        clusters = pd.DataFrame({
+            'uID': features['uID'].values,
+            'micro': micro.astype(np.int32),
+            'cluster': ward[micro].astype(np.int32),
+        })
+        _write_clusters(case, clusters)
+
+        if 'part' in features.columns:
+            groups = case.name + features['part'].map(str)
+        else:
+            groups = pd.Series(case.name, index=features.index)
+        counts.append(clusters.groupby([groups.values, clusters['cluster'].values]).size())
+
+    composition = pd.concat(counts).groupby(level=[0, 1], sort=False).sum().unstack(fill_value=0)
+    composition = composition.div(composition.sum(axis=1), axis=0)
+    if len(composition) < 2:
+        return composition, np.empty((0, 4))
+    return composition, hierarchy.linkage(composition.values, 'ward')
+
+
+def read_clusters(case):
+    """
+    Read building-level clusters of a case.
+
+    Returns
+    -------
+    DataFrame
+        ``uID``, micro-cluster (``micro``) and cluster (``cluster``) of
+        buildings
+
+    Examples
+    --------
+    >>> clusters = read_clusters(case)
+    """
+    return pq.read_table(store_path(case, "clusters"), memory_map=True).to_pandas()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# contextual.py
+# contextual (summative) characters of a single case
+
+import numpy as np
+import pandas as pd
+
+from .features import features_fingerprint, read_features
+
+__all__ = ["TO_SUMM", "SPEC", "summarise", "summarise_case", "fingerprint"]
+
+TO_SUMM = ['sdbAre', 'sdbPer', 'ssbCCo', 'ssbCor', 'ssbSqu', 'ssbERI',
+           'ssbElo', 'ssbCCD', 'stbCeA', 'mtbSWR', 'mtbAli', 'mtbNDi', 'ldbPWL',
+           'stbSAl', 'ltcBuA', 'sssLin', 'sdsSPW', 'stsOpe', 'svsSDe', 'sdsAre', 'sdsBAr', 'sisBpM',
+           'sdcLAL', 'sdcAre', 'sscERI', 'sicCAR', 'stcSAl', 'ldkAre', 'lskElo', 'likGra', 'meshedness',
+           ]
+SPEC = ['sdsLen']  # measured only along seashore street (case == 1)
+
+
+# value replacing zeros in Theil index (as in inequality.theil)
+_SMALL = np.finfo('float').tiny
+
+
+def _nearest(start, count, q):
+    # position of percentile q with 'nearest' interpolation (numpy rounds half to even)
+    return start + np.around(q / 100 * (count - 1)).astype(np.int64)
+
+
+def _linear(values, start, count, q):
+    # percentile q with linear interpolation
+    index = q / 100 * (count - 1)
+    below = np.floor(index).astype(np.int64)
+    above = np.minimum(below + 1, count - 1)
+    weight = index - below
+    return values[start + below] * (1 - weight) + values[start + above] * weight
+
+
+def _summarise_column(values, codes, n_groups):
+    """
+    meanIQ, rangeIQ and TheilID of a single column for all groups at once.
+
+    Equivalent of ``np.mean(mm.limit_range(values, (25, 75)))``,
+    ``sp.stats.iqr(values)`` and ``Theil(mm.limit_range(values, (10, 90))).T``
+    applied to each group, including their handling of NaN and of groups with
+    less than three values (not limited).
+    """
+    order = np.lexsort((values, codes))  # NaN is sorted last within a group
+    v, g = values[order], codes[order]
+    position = np.arange(len(v))
+    count = np.bincount(g, minlength=n_groups)
+    start = np.cumsum(count) - count
+    nan = np.isnan(v)
+    has_nan = np.bincount(g, weights=nan, minlength=n_groups) > 0
+    small = count <= 2
+
+    # runs of equal values within a group (limit_range keeps all ties)
+    new = np.ones(len(v), dtype=bool)
+    new[1:] = (g[1:] != g[:-1]) | (v[1:] != v[:-1])
+    run = np.cumsum(new) - 1
+    run_first = np.flatnonzero(new)
+    run_last = np.append(run_first[1:] - 1, len(v) - 1)
+
+    def _limited(low, high):
+        first = run_first[run[_nearest(start, count, low)]]
+        last = run_last[run[_nearest(start, count, high)]]
+        return ((position >= first[g]) & (position <= last[g])) | small[g]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        iq = _limited(25, 75)
+        mean_iq = (np.bincount(g, weights=np.where(iq, v, 0), minlength=n_groups)
+                   / np.bincount(g, weights=iq, minlength=n_groups))
+        nanmean = (np.bincount(g, weights=np.where(nan, 0, v), minlength=n_groups)
+                   / np.bincount(g, weights=~nan, minlength=n_groups))
+        range_iq = _linear(v, start, count, 75) - _linear(v, start, count, 25)
+
+        id_ = _limited(10, 90)
+        y = np.where(id_, np.where(v == 0, _SMALL, v), 0)
+        total = np.bincount(g, weights=y, minlength=n_groups)
+        n = np.bincount(g, weights=id_, minlength=n_groups)
+        share = y / total[g]
+        theil = np.bincount(g, weights=np.where(id_, share * np.log(n[g] * share), 0),
+                            minlength=n_groups)
+
+    # limit_range of values with NaN is empty, unless there are less than three
+    mean_iq = np.where(has_nan, np.where(small, nanmean, np.nan), mean_iq)
+    range_iq = np.where(has_nan, np.nan, range_iq)
+    theil = np.where(has_nan, np.where(small, np.nan, 0), theil)
+    return mean_iq, range_iq, theil
+
+
+def summarise(data, by, columns):
+    """
+    Measure meanIQ, rangeIQ and TheilID of columns within groups.
+
+    All groups of a column are processed at once by grouped sorting and
+    reductions instead of a loop over groups.
+
+    Parameters
+    ----------
+    data : DataFrame
+        DataFrame containing ``columns``
+    by : array-like
+        group of each row of ``data`` (e.g. case or case and part)
+    columns : list
+        names of summarised columns
+
+    Returns
+    -------
+    DataFrame
+        DataFrame indexed by groups (in order of appearance) with columns
+        ``col + '_meanIQ'``, ``col + '_rangeIQ'`` and ``col + '_TheilID'``
+        for each of ``columns``
+
+    Examples
+    --------
+    >>> summative = summarise(data, data.case_name, TO_SUMM)
+    """
+    codes, groups = pd.factorize(np.asarray(by))
+    results = {}
+    for col in columns:
+        values = data[col].values.astype(float)
+        mean_iq, range_iq, theil = _summarise_column(values, codes, len(groups))
+        results[col + '_meanIQ'] = mean_iq
+        results[col + '_rangeIQ'] = range_iq
+        results[col + '_TheilID'] = theil
+    return pd.DataFrame(results, index=groups)
+
+
+def summarise_case(case):
+    """
+    Measure contextual characters of a case (or each of its parts).
+
+    Parameters
+    ----------
+    case : Case
+        case to be summarised
+
+    Returns
+    -------
+    DataFrame
+        DataFrame with a row per case (or per part)
+    """
+    l = case.name
+
+    # characters measured by stage 02 joined with manually assigned part and
+    # case read from the current GeoPackage
+    data = read_features(case, ['part', 'case'] + TO_SUMM + SPEC)
+    if 'case' not in data.columns:
+        raise ValueError("Attribute 'case' (seashore street) is missing in layer {}."
+                         .format(l + '_str'))
+
+    if 'part' in data.columns:
+        by = l + data.part.map(str)
+        index = [l + str(part) for part in set(data.part)]
+    else:
+        by = np.full(len(data), l, dtype=object)
+        index = [l]
+
+    summative = summarise(data, by, TO_SUMM)
+    spec = data.case == 1
+    summative = summative.join(summarise(data.loc[spec], by[spec], SPEC))
+    # groups without seashore street (as measured on empty values)
+    for col in SPEC:
+        summative[col + '_TheilID'] = summative[col + '_TheilID'].fillna(0)
+    return summative.reindex(index)
+
+
+def fingerprint(case):
+    """
+    Fingerprint of inputs of :func:`summarise_case`.
+
+    Hashes the stored feature matrix and ``uID`` and ``part`` of ``name_blg``
+    and ``nID`` and ``case`` of ``name_str`` in the GeoPackage (see
+    :func:`~seashore.features.features_fingerprint`).
+    """
+    return features_fingerprint(case, params={'to_summ': TO_SUMM, 'spec': SPEC})
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# dtm.py
+# cache of DTM tiles converted from ASCII grids to tiled GeoTIFFs
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import rasterio as rio
+from rasterio.enums import Resampling
+
+__all__ = ["CACHE", "source_path", "source_stamps", "cached_tile", "build_cache"]
+
+# folder of converted tiles within the DTM folder
+CACHE = "cache"
+OVERVIEWS = [2, 4, 8, 16]
+
+
+def source_path(rpart, mdt="MDT/"):
+    """Path to the original ASCII grid of DTM tile ``Id_Unidade``."""
+    return os.path.join(mdt, rpart + "-top_orto.asc")
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return {"SOURCE_SIZE": str(stat.st_size), "SOURCE_MTIME": str(stat.st_mtime_ns)}
+
+
+def source_stamps(rparts, mdt="MDT/"):
+    """
+    Size and modification time of original ASCII grids of DTM tiles.
+
+    Stamps are those stored with converted tiles (see :func:`cached_tile`),
+    so results derived from tiles can be invalidated once a tile changes.
+
+    Parameters
+    ----------
+    rparts : list
+        ``Id_Unidade`` of tiles
+    mdt : str (default 'MDT/')
+        folder containing DTM tiles
+
+    Returns
+    -------
+    dict
+        stamps keyed by ``Id_Unidade``, None for tiles without the source
+    """
+    stamps = {}
+    for rpart in rparts:
+        source = source_path(rpart, mdt)
+        stamps[rpart] = _stamp(source) if os.path.exists(source) else None
+    return stamps
+
+
+def _fresh(path, stamp):
+    if not os.path.exists(path):
+        return False
+    with rio.open(path) as src:
+        tags = src.tags()
+    return all(tags.get(key) == value for key, value in stamp.items())
+
+
+def _convert(source, path, stamp):
+    with rio.open(source) as src:
+        profile = src.profile
+        array = src.read()
+    profile.update(
+        driver="GTiff",
+        tiled=True,
+        blockxsize=256,
+        blockysize=256,
+        compress="deflate",
+        predictor=3 if array.dtype.kind == "f" else 2,
+    )
+    # write next to the target and replace it, as several processes may convert
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with rio.open(tmp, "w", **profile) as dst:
+        dst.write(array)
+        dst.update_tags(**stamp)
+        dst.build_overviews(OVERVIEWS, Resampling.average)
+    os.replace(tmp, path)
+
+
+def cached_tile(rpart, mdt="MDT/"):
+    """
+    Path to GeoTIFF of DTM tile ``Id_Unidade``, converted if needed.
+
+    Tile is converted from the ASCII grid to tiled (256 x 256), deflate
+    compressed GeoTIFF with overviews stored in ``mdt/cache/``. Size and
+    modification time of the source are stored as tags of the GeoTIFF, which
+    is converted again once the source changes. Values are not altered.
+
+    Parameters
+    ----------
+    rpart : str
+        ``Id_Unidade`` of a tile
+    mdt : str (default 'MDT/')
+        folder containing DTM tiles
+
+    Returns
+    -------
+    str
+        path to GeoTIFF
+
+    Examples
+    --------
+    >>> with rio.open(cached_tile(rpart, mdt)) as src:
+    ...     array = src.read(1, window=window)
+    """
+    source = source_path(rpart, mdt)
+    path = os.path.join(mdt, CACHE, rpart + ".tif")
+    stamp = _stamp(source)
+    if not _fresh(path, stamp):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _convert(source, path, stamp)
+    return path
+
+
+def build_cache(rparts, mdt="MDT/", workers=None):
+    """
+    Convert DTM tiles in advance (in parallel).
+
+    Tiles without the source ASCII grid are skipped, fresh tiles are not
+    converted again.
+
+    Parameters
+    ----------
+    rparts : list
+        ``Id_Unidade`` of tiles
+    mdt : str (default 'MDT/')
+        folder containing DTM tiles
+    workers : int (default None)
+        number of worker processes, None uses all cores
+
+    Returns
+    -------
+    list
+        paths to GeoTIFFs
+
+    Examples
+    --------
+    >>> build_cache(grid.Id_Unidade, 'MDT/')
+    """
+    rparts = [r for r in rparts if os.path.exists(source_path(r, mdt))]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(cached_tile, rparts, [mdt] * len(rparts)))
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# elevation.py
+# stored histograms of elevation within buildings
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .store import store_path
+
+__all__ = ["write_histogram", "read_histogram", "share_below", "quantile"]
+
+
+def write_histogram(case, histogram, width):
+    """
+    Write histograms of elevation of a case to ``data/store/part/name_elevation.parquet``.
+
+    Parameters
+    ----------
+    case : Case
+        case of buildings
+    histogram : DataFrame
+        counts of pixels of buildings (``uID``) in non-empty bins (``bin``),
+        as returned by :func:`~seashore.flood.zonal_case`
+    width : float
+        width of bins (m)
+
+    Examples
+    --------
+    >>> stats, histogram = zonal_case(case, grid, histogram=0.1)
+    >>> write_histogram(case, histogram, 0.1)
+    """
+    path = store_path(case, "elevation")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(histogram[["uID", "bin", "count"]], preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"width"] = repr(float(width)).encode()
+    table = table.replace_schema_metadata(metadata)
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def read_histogram(case):
+    """
+    Read histograms of elevation of a case.
+
+    Returns
+    -------
+    histogram : DataFrame
+        counts of pixels of buildings (``uID``) in non-empty bins (``bin``),
+        sorted by ``uID`` and ``bin``
+    width : float
+        width of bins (m)
+
+    Examples
+    --------
+    >>> histogram, width = read_histogram(case)
+    """
+    table = pq.read_table(store_path(case, "elevation"), memory_map=True)
+    width = float(table.schema.metadata[b"width"])
+    histogram = table.to_pandas().sort_values(["uID", "bin"], kind="mergesort")
+    return histogram.reset_index(drop=True), width
+
+
+def share_below(histogram, width, level):
+    """
+    Share of pixels of each building lower than ``level``.
+
+    Shares are exact if ``level`` is a multiple of ``width``, otherwise the bin
+    containing ``level`` is interpolated linearly.
+
+    Parameters
+    ----------
+    histogram : DataFrame
+        histograms as returned by :func:`read_histogram`
+    width : float
+        width of bins (m)
+    level : float
+        elevation (m)
+
+    Returns
+    -------
+    Series
+        share indexed by ``uID``
+
+    Examples
+    --------
+    >>> histogram, width = read_histogram(case)
+    >>> below = share_below(histogram, width, 5)
+    """
+    lower = histogram["bin"].values * width
+    fraction = np.clip((level - lower) / width, 0, 1)
+    # bins of exact multiples of width are decided without rounding errors
+    edge = np.round(level / width)
+    if np.isclose(edge * width, level):
+        fraction = (histogram["bin"].values < edge).astype(float)
+    counts = histogram["count"].values
+    below = pd.Series(counts * fraction).groupby(histogram["uID"].values).sum()
+    return below / pd.Series(counts).groupby(histogram["uID"].values).sum()
+
+
+def quantile(histogram, width, q=0.5):
+    """
+    Quantile of elevation of each building, interpolated within bins.
+
+    The result lies within ``width`` from the quantile of pixels (lower,
+    inverted CDF), e.g. from the median for buildings covering many pixels.
+
+    Parameters
+    ----------
+    histogram : DataFrame
+        histograms as returned by :func:`read_histogram` (sorted by ``uID``
+        and ``bin``)
+    width : float
+        width of bins (m)
+    q : float (default 0.5)
+        quantile between 0 and 1
+
+    Returns
+    -------
+    Series
+        quantile indexed by ``uID``
+
+    Examples
+    --------
+    >>> median = quantile(histogram, width, 0.5)
+    """
+    uid = histogram["uID"].values
+    counts = histogram["count"].values.astype(float)
+    cumulative = pd.Series(counts).groupby(uid).cumsum().values
+    total = pd.Series(counts).groupby(uid).transform("sum").values
+    target = q * total
+    # first bin of each building reaching the target
+    reached = (cumulative >= target) & (cumulative - counts < target)
+    reached |= (target == 0) & (cumulative - counts == 0)
+    first = pd.Series(np.flatnonzero(reached)).groupby(uid[reached]).first()
+    i = first.values
+    position = (target[i] - (cumulative[i] - counts[i])) / counts[i]
+    return pd.Series((histogram["bin"].values[i] + position) * width, index=first.index)
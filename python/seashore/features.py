@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# features.py
+# building-level matrix of primary characters of a case
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .cache import case_fingerprint, layer_fingerprint
+from .gpkg import read_columns
+from .store import MANUAL, read_store, store_path
+
+__all__ = ["CHARACTERS", "KEYS", "build_features", "write_features", "read_features",
+           "features_fingerprint", "feature_matrix"]
+
+# primary characters measured by stage 02 per layer
+CHARACTERS = {
+    "blg": ['sdbAre', 'sdbPer', 'ssbCCo', 'ssbCor', 'ssbSqu', 'ssbERI', 'ssbElo', 'ssbCCD',
+            'stbCeA', 'mtbSWR', 'mtbAli', 'mtbNDi', 'ldbPWL', 'stbSAl', 'ltcBuA'],
+    "str": ['sdsLen', 'sssLin', 'sdsSPW', 'stsOpe', 'svsSDe', 'sdsAre', 'sdsBAr', 'sisBpM',
+            'meshedness'],
+    "tess": ['sdcLAL', 'sdcAre', 'sscERI', 'sicCAR', 'stcSAl'],
+    "blocks": ['ldkAre', 'lskElo', 'likGra'],
+}
+# join keys of elements
+KEYS = ['uID', 'nID', 'bID']
+# layer and join key of manually assigned attributes
+_MANUAL_SOURCES = {'part': ('blg', 'uID'), 'case': ('str', 'nID')}
+
+
+def _lookup(table, key, values, columns):
+    """Values of ``columns`` of ``table`` at ``key`` equal to ``values`` (NaN if missing)."""
+    table = table.drop_duplicates(key).set_index(key)
+    return table.reindex(values)[columns].reset_index(drop=True)
+
+
+def build_features(buildings, edges, tessellation, blocks):
+    """
+    Join primary characters of all elements to buildings.
+
+    Parameters
+    ----------
+    buildings, edges, tessellation, blocks : DataFrame
+        layers of a case as measured by stage 02 (geometry is ignored)
+
+    Returns
+    -------
+    DataFrame
+        DataFrame with a row per building containing available :data:`KEYS`
+        and all available :data:`CHARACTERS` as float. Manually assigned
+        attributes (:data:`~seashore.store.MANUAL`) are not included, they
+        are joined by :func:`read_features`.
+    """
+    features = pd.DataFrame({key: buildings[key].values for key in KEYS
+                             if key in buildings.columns})
+
+    sources = [(buildings, None), (edges, 'nID'), (tessellation, 'uID'), (blocks, 'bID')]
+    for (layer, chars), (source, key) in zip(CHARACTERS.items(), sources):
+        chars = [c for c in chars if c in source.columns]
+        if key is None:
+            values = source[chars].reset_index(drop=True)
+        else:
+            values = _lookup(source, key, buildings[key].values, chars)
+        for col in chars:
+            features[col] = values[col].values.astype(np.float64)
+
+    for key in KEYS:
+        if key in features.columns and features[key].notna().all():
+            features[key] = features[key].astype(np.int64)
+    return features
+
+
+def write_features(case, features):
+    """Write feature matrix of a case to ``data/store/part/name_features.parquet``."""
+    path = store_path(case, "features")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    pq.write_table(pa.Table.from_pandas(features, preserve_index=False), tmp)
+    os.replace(tmp, path)
+
+
+def _join_manual(case, features, columns):
+    """Join manually assigned ``columns`` from the current GeoPackage layers."""
+    for col in columns:
+        suffix, key = _MANUAL_SOURCES[col]
+        layer = read_columns(case.path, case.name + '_' + suffix, [key, col])
+        if col in layer.columns and key in layer.columns and key in features.columns:
+            features[col] = _lookup(layer, key, features[key].values, [col])[col].values
+    return features
+
+
+def read_features(case, columns=None):
+    """
+    Read feature matrix of a case, only the requested columns.
+
+    If the feature matrix is not stored, it is joined from stored layers (see
+    :func:`~seashore.store.read_store`). Manually assigned attributes
+    (``part`` of buildings and ``case`` of edges) are not part of the stored
+    matrix, they are read from the current GeoPackage layers and joined on
+    ``uID`` and ``nID``.
+
+    Parameters
+    ----------
+    case : Case
+        case to be read
+    columns : list (default None)
+        columns to be read, None reads all. Missing columns are skipped.
+
+    Returns
+    -------
+    DataFrame
+
+    Examples
+    --------
+    >>> data = read_features(case, ['part', 'case'] + TO_SUMM + SPEC)
+    """
+    manual = MANUAL if columns is None else [c for c in MANUAL if c in columns]
+    requested = columns
+    if columns is not None:
+        columns = [c for c in columns if c not in MANUAL]
+        columns += [_MANUAL_SOURCES[c][1] for c in manual
+                    if _MANUAL_SOURCES[c][1] not in columns]
+
+    path = store_path(case, "features")
+    if os.path.exists(path):
+        names = [c for c in pq.read_schema(path).names if c not in MANUAL]
+        columns = names if columns is None else [c for c in columns if c in names]
+        features = pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+    else:
+        chars = CHARACTERS
+        if columns is not None:
+            chars = {layer: [c for c in names if c in columns] for layer, names in chars.items()}
+        features = build_features(
+            read_store(case, 'blg', KEYS + chars['blg']),
+            read_store(case, 'str', ['nID'] + chars['str']),
+            read_store(case, 'tess', ['uID'] + chars['tess']),
+            read_store(case, 'blocks', ['bID'] + chars['blocks']),
+        )
+
+    features = _join_manual(case, features, manual)
+    if requested is not None:
+        features = features[[c for c in requested if c in features.columns]]
+    return features
+
+
+def features_fingerprint(case, params=None):
+    """
+    Fingerprint of the feature matrix of a case as read by :func:`read_features`.
+
+    Combines the hash of the stored feature matrix (or of attributes of layers
+    it is joined from, if not stored) with the hash of manually assigned
+    attributes and their join keys in the GeoPackage layers.
+
+    Parameters
+    ----------
+    case : Case
+        case to be hashed
+    params : dict (default None)
+        parameters of a stage influencing its results
+
+    Returns
+    -------
+    str
+        hexadecimal SHA-1 digest
+    """
+    sha = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode())
+    path = store_path(case, "features")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(2 ** 20), b""):
+                sha.update(chunk)
+    else:
+        sha.update(case_fingerprint(case, ['blg', 'str', 'tess', 'blocks'],
+                                    subset='attributes').encode())
+    for col, (suffix, key) in _MANUAL_SOURCES.items():
+        layer = case.name + '_' + suffix
+        sha.update("{}:{};".format(col, layer_fingerprint(case.path, layer, [key, col])).encode())
+    return sha.hexdigest()
+
+
+def feature_matrix(case, columns):
+    """
+    Read characters of a case as a contiguous array.
+
+    Parameters
+    ----------
+    case : Case
+        case to be read
+    columns : list
+        characters to be read (all of them must be available)
+
+    Returns
+    -------
+    uid : ndarray
+        ``uID`` of rows
+    matrix : ndarray
+        C-contiguous float64 array of shape (buildings, columns)
+
+    Examples
+    --------
+    >>> uid, X = feature_matrix(case, CHARACTERS['blg'])
+    """
+    features = read_features(case, ['uID'] + list(columns))
+    missing = [c for c in columns if c not in features.columns]
+    if missing:
+        raise ValueError("Characters {} are not available.".format(missing))
+    matrix = np.ascontiguousarray(features[list(columns)].values, dtype=np.float64)
+    return features['uID'].values, matrix
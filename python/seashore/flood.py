@@ -0,0 +1,331 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# flood.py
+# elevation of buildings based on DTM
+
+import numpy as np
+import pandas as pd
+import rasterio as rio
+from rasterio import features
+from affine import Affine
+from rasterio.enums import MergeAlg
+from rasterio.windows import Window
+from shapely.geometry import box
+
+from .cache import case_fingerprint
+from .dtm import cached_tile, source_stamps
+from .store import read_store
+
+__all__ = ["STATS", "read_window", "zonal_stats", "zonal_case", "fingerprint"]
+
+STATS = ['min', 'max', 'median', 'mean', 'count']
+
+
+def _snap(bounds, transform):
+    """Expand bounds by a pixel and align them to the pixel grid of ``transform``."""
+    minx, miny, maxx, maxy = bounds
+    xres, yres = transform.a, -transform.e
+    left = transform.c + (np.floor((minx - transform.c) / xres) - 1) * xres
+    right = transform.c + (np.ceil((maxx - transform.c) / xres) + 1) * xres
+    top = transform.f - (np.floor((transform.f - maxy) / yres) - 1) * yres
+    bottom = transform.f - (np.ceil((transform.f - miny) / yres) + 1) * yres
+    return left, bottom, right, top
+
+
+def read_window(sources, bounds):
+    """
+    Read values of DTM tiles within bounds into a single array.
+
+    Bounds are expanded by a pixel and aligned to the pixel grid of the first
+    tile, which all tiles share. Each tile is read by an integer window, so
+    values are never resampled (``rasterio.merge.merge`` with bounds (v1.1)
+    duplicates rows of windows not aligned exactly in floating point). Where
+    tiles overlap, the first valid value is kept, as by ``merge``. Cells
+    outside of tiles are nodata of the first tile.
+
+    Parameters
+    ----------
+    sources : list
+        open rasterio datasets of tiles
+    bounds : tuple
+        (minx, miny, maxx, maxy)
+
+    Returns
+    -------
+    array : ndarray
+        2D array of values
+    affine : Affine
+        transform of ``array``
+
+    Examples
+    --------
+    >>> array, affine = read_window(sources, subset.total_bounds)
+    """
+    transform = sources[0].transform
+    nodata = sources[0].nodata if sources[0].nodata is not None else -999
+    left, bottom, right, top = _snap(bounds, transform)
+    xres, yres = transform.a, -transform.e
+    height = int(round((top - bottom) / yres))
+    width = int(round((right - left) / xres))
+    array = np.full((height, width), nodata, dtype=sources[0].dtypes[0])
+
+    for src in sources:
+        row = int(round((top - src.transform.f) / yres))
+        col = int(round((src.transform.c - left) / xres))
+        r0, c0 = max(row, 0), max(col, 0)
+        r1, c1 = min(row + src.height, height), min(col + src.width, width)
+        if r0 >= r1 or c0 >= c1:
+            continue
+        values = src.read(1, window=Window(c0 - col, r0 - row, c1 - c0, r1 - r0))
+        if src.nodata is not None:
+            values[values == src.nodata] = nodata
+        target = array[r0:r1, c0:c1]
+        empty = ~_valid(target, nodata)
+        target[empty] = values[empty]
+    return array, Affine(xres, 0, left, 0, -yres, top)
+
+
+def _valid(values, nodata):
+    valid = values != nodata
+    if np.issubdtype(values.dtype, np.floating):
+        valid &= ~np.isnan(values)
+    return valid
+
+
+def _measure(labels, array, nodata, out, width=None, histogram=None):
+    """
+    Fill ``out`` with statistics of zones labelled in ``labels`` (position + 1).
+
+    If ``width`` is given, counts of pixels of zones in bins of elevation are
+    appended to ``histogram`` as arrays of zones, bins and counts.
+    """
+    valid = (labels > 0) & _valid(array, nodata)
+    zone = labels[valid] - 1
+    # rasterstats reads windows of an ndarray into float64 arrays
+    values = array[valid].astype(np.float64)
+    order = np.lexsort((values, zone))
+    zone, values = zone[order], values[order]
+
+    n = len(out['count'])
+    count = np.bincount(zone, minlength=n)
+    end = np.cumsum(count)
+    start = end - count
+    has = count > 0
+    out['count'][has] = count[has]
+    out['min'][has] = values[start[has]]
+    out['max'][has] = values[end[has] - 1]
+    low, high = values[(start + (count - 1) // 2)[has]], values[(start + count // 2)[has]]
+    out['median'][has] = (low + high) / 2
+    # sum over count, as the masked mean
+    if has.any():
+        out['mean'][has] = np.add.reduceat(values, start[has]) / count[has]
+
+    if width is not None:
+        # pixels are sorted by zone and value, so bins are runs of equal pairs
+        bins = np.floor(values / width).astype(np.int64)
+        change = np.ones(len(zone), dtype=bool)
+        change[1:] = (zone[1:] != zone[:-1]) | (bins[1:] != bins[:-1])
+        first = np.flatnonzero(change)
+        histogram.append((zone[first], bins[first], np.diff(np.append(first, len(zone)))))
+
+
+def zonal_stats(geometries, array, affine, nodata=-999, histogram=None):
+    """
+    Zonal statistics (min, max, median, mean, count) of ``array`` within geometries.
+
+    All geometries are burned into a single raster labelled by their position,
+    statistics of all zones are then computed at once from pixels sorted by
+    label and value. Pixels are assigned to zones as by
+    ``rasterstats.zonal_stats`` (pixel centre within a geometry), pixels
+    equal to ``nodata`` or NaN are ignored. Geometries sharing pixels with
+    others (overlapping footprints) are burned again in batches of
+    geometries which do not intersect each other, as a label raster can hold
+    only one label per pixel.
+
+    Statistics equal those of ``rasterstats.zonal_stats`` of ``array``,
+    which reads windows of an ndarray as float64: values are converted to
+    float64 and the mean is their sum over the count, as the masked mean of
+    rasterstats. Pixels are summed in a different order, so means may differ
+    in the last digits.
+
+    Parameters
+    ----------
+    geometries : GeoSeries
+        zones
+    array : ndarray
+        2D array of values
+    affine : Affine
+        transform of ``array``
+    nodata : float (default -999)
+        value ignored
+    histogram : float (default None)
+        width of bins of histograms of values within zones. None does not
+        measure histograms.
+
+    Returns
+    -------
+    stats : DataFrame
+        :data:`STATS` indexed as ``geometries`` (NaN and count 0 for zones
+        without valid pixels)
+    histogram : DataFrame
+        only if ``histogram`` is given, counts of pixels of zones (``index``
+        of ``geometries``) in non-empty bins (``bin``, lower edge as a
+        multiple of width)
+
+    Examples
+    --------
+    >>> stats = zonal_stats(blg.geometry, array[0], affine)
+    """
+    geoms = list(geometries)
+    n = len(geoms)
+    out = {stat: np.full(n, np.nan) for stat in STATS}
+    out['count'] = np.zeros(n, dtype=int)
+    bins = []
+    ids = [i for i, geom in enumerate(geoms) if geom is not None and not geom.is_empty]
+
+    def burn(shapes, **kwargs):
+        return features.rasterize(shapes, out_shape=array.shape, transform=affine, fill=0,
+                                  **kwargs)
+
+    if ids:
+        labels = burn(((geoms[i], i + 1) for i in ids), dtype='int32')
+        hits = burn(((geoms[i], 1) for i in ids), dtype='uint16', merge_alg=MergeAlg.add)
+        # geometries sharing a pixel intersect the one which holds its label
+        shared = hits > 1
+        overlaps = {}
+        if shared.any():
+            sindex = geometries.reset_index(drop=True).sindex
+
+            def intersecting(i):
+                return [j for j in sindex.intersection(geoms[i].bounds)
+                        if j != i and geoms[j] is not None and geoms[j].intersects(geoms[i])]
+
+            members = set()
+            for i in np.unique(labels[shared]) - 1:
+                members.add(i)
+                members.update(intersecting(i))
+            overlaps = {i: set(intersecting(i)) for i in members}
+            labels[np.isin(labels, np.array(sorted(overlaps)) + 1)] = 0
+        _measure(labels, array, nodata, out, histogram, bins)
+
+        remaining = sorted(overlaps)
+        while remaining:
+            batch, rest = set(), []
+            for i in remaining:
+                if overlaps[i].isdisjoint(batch):
+                    batch.add(i)
+                else:
+                    rest.append(i)
+            labels = burn(((geoms[i], i + 1) for i in batch), dtype='int32')
+            _measure(labels, array, nodata, out, histogram, bins)
+            remaining = rest
+
+    stats = pd.DataFrame(out, columns=STATS, index=geometries.index)
+    if histogram is None:
+        return stats
+    zone, bin_, count = (np.concatenate(a) for a in zip(*bins)) if bins else ([], [], [])
+    return stats, pd.DataFrame({
+        'index': geometries.index.values[np.asarray(zone, dtype=np.int64)],
+        'bin': np.asarray(bin_, dtype=np.int32),
+        'count': np.asarray(count, dtype=np.int32),
+    })
+
+
+def zonal_case(case, grid, mdt='MDT/', block=500, histogram=None):
+    """
+    Measure zonal statistics of DTM within building footprints of a case.
+
+    Buildings are grouped into square blocks (by centroid). For each block,
+    only the window covering its buildings is read from the DTM tiles
+    intersecting it (found using ``grid``), across tile boundaries. Windows
+    are aligned with the pixel grid of tiles, so the values equal those of
+    the mosaic of all tiles, which is never materialised. Tiles are read from
+    GeoTIFFs converted from ASC files (see :func:`~seashore.dtm.cached_tile`).
+
+    Optionally, histograms of elevation within buildings are measured in the
+    same pass, to be stored by :func:`~seashore.elevation.write_histogram`.
+
+    Parameters
+    ----------
+    case : Case
+        case to be measured
+    grid : GeoDataFrame
+        grid of DTM tiles (``MDT1m_LiDAR2011_secciona.shp``)
+    mdt : str (default 'MDT/')
+        folder containing DTM tiles
+    block : float (default 500)
+        size of a block of buildings read at once (in units of CRS)
+    histogram : float (default None)
+        width of bins of histograms of elevation (m). None does not measure
+        histograms.
+
+    Returns
+    -------
+    stats : DataFrame
+        zonal statistics of buildings with their ``uID``
+    histogram : DataFrame
+        only if ``histogram`` is given, counts of pixels of buildings
+        (``uID``) in non-empty bins of elevation (``bin``, lower edge as a
+        multiple of width)
+    """
+    blg = read_store(case, 'blg', ['uID'], geometry=True)
+
+    centroids = blg.geometry.centroid
+    keys = pd.Series(list(zip(np.floor(centroids.x / block), np.floor(centroids.y / block))),
+                     index=blg.index)
+    sindex = grid.sindex
+    rasters = {}
+    stats = pd.DataFrame(index=blg.index, columns=STATS, dtype=float)
+    bins = []
+    try:
+        for _, subset in blg.groupby(keys, sort=False):
+            bounds = subset.total_bounds
+            candidates = sorted(sindex.intersection(bounds))
+            tiles = grid.iloc[candidates]
+            tiles = tiles[tiles.intersects(box(*bounds))]
+            if tiles.empty:
+                continue
+            for rpart in tiles.Id_Unidade:
+                if rpart not in rasters:
+                    rasters[rpart] = rio.open(cached_tile(rpart, mdt))
+            sources = [rasters[rpart] for rpart in tiles.Id_Unidade]
+
+            array, affine = read_window(sources, bounds)
+            result = zonal_stats(subset.geometry, array, affine, histogram=histogram)
+            if histogram is not None:
+                result, hist = result
+                bins.append(hist)
+            stats.loc[subset.index] = result
+    finally:
+        for raster in rasters.values():
+            raster.close()
+
+    stats['count'] = stats['count'].fillna(0).astype(int)
+    stats.insert(0, 'uID', blg.uID.values)
+    if histogram is None:
+        return stats
+
+    bins = pd.concat(bins, ignore_index=True) if bins else pd.DataFrame(
+        {'index': [], 'bin': [], 'count': []})
+    uid = blg.uID.loc[bins.pop('index').values].values
+    bins.insert(0, 'uID', uid.astype(np.int64))
+    return stats, bins
+
+
+def fingerprint(case, grid, mdt='MDT/', histogram=None):
+    """
+    Fingerprint of geometries of buildings and case limit and of DTM tiles.
+
+    DTM tiles intersecting buildings (found using ``grid``) are represented
+    by size and modification time of their sources (see
+    :func:`~seashore.dtm.source_stamps`), so zonal statistics are measured
+    again once any of them changes.
+    """
+    bounds = box(*read_store(case, 'blg', [], geometry=True).total_bounds)
+    tiles = grid.iloc[sorted(grid.sindex.intersection(bounds.bounds))]
+    tiles = tiles[tiles.intersects(bounds)]
+    params = {'stats': STATS, 'dtm': source_stamps(sorted(tiles.Id_Unidade), mdt)}
+    if histogram is not None:
+        params['histogram'] = histogram
+    return case_fingerprint(case, ['blg', 'case'], params=params, subset='geometry')
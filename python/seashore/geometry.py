@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# geometry.py
+# flat coordinate arrays of geometries and numba kernels shared by modules
+
+import numpy as np
+from numba import njit
+
+__all__ = ["flatten", "cross", "convex_hull"]
+
+
+def flatten(geoms):
+    """
+    Extract rings of (Multi)Polygons into flat arrays.
+
+    Coordinates are copied ring by ring in a loop over geometries, as shapely
+    (1.7) has no vectorized access to coordinates. The loop dominates the
+    run time of kernels consuming the arrays (e.g. about 95 % of
+    :func:`~seashore.shape.shape_characters` for 90 000 buildings).
+
+    Parameters
+    ----------
+    geoms : iterable
+        Polygons or MultiPolygons
+
+    Returns
+    -------
+    coords : ndarray
+        (n, 2) array of all vertices (rings are closed)
+    ring_offsets : ndarray
+        start of each ring in ``coords`` (and the end of the last one)
+    geom_offsets : ndarray
+        start of rings of each geometry in ``ring_offsets`` (and the end)
+    exterior : ndarray
+        whether the ring is exterior
+    parts : ndarray
+        number of polygons of each geometry
+    """
+    coords = []
+    ring_offsets = [0]
+    geom_offsets = [0]
+    exterior = []
+    parts = []
+
+    n = 0
+    for geom in geoms:
+        polygons = geom.geoms if geom.geom_type == "MultiPolygon" else [geom]
+        parts.append(len(polygons))
+        for polygon in polygons:
+            rings = [polygon.exterior] + list(polygon.interiors)
+            for i, ring in enumerate(rings):
+                array = np.asarray(ring.coords)[:, :2]
+                coords.append(array)
+                n += len(array)
+                ring_offsets.append(n)
+                exterior.append(i == 0)
+        geom_offsets.append(len(exterior))
+
+    coords = np.concatenate(coords) if coords else np.empty((0, 2))
+    return (
+        np.ascontiguousarray(coords, dtype=np.float64),
+        np.asarray(ring_offsets, dtype=np.int64),
+        np.asarray(geom_offsets, dtype=np.int64),
+        np.asarray(exterior, dtype=np.bool_),
+        np.asarray(parts, dtype=np.int64),
+    )
+
+
+@njit(cache=True)
+def cross(ox, oy, ax, ay, bx, by):
+    """Cross product of vectors o-a and o-b (positive if o, a, b turn counter-clockwise)."""
+    return (ax - ox) * (by - oy) - (ay - oy) * (bx - ox)
+
+
+@njit(cache=True)
+def convex_hull(pts):
+    """
+    Convex hull of points by Andrew's monotone chain.
+
+    Parameters
+    ----------
+    pts : ndarray
+        (n, 2) array of points
+
+    Returns
+    -------
+    ndarray
+        counter-clockwise vertices of the hull (unclosed)
+    """
+    order = np.argsort(pts[:, 1], kind="mergesort")
+    order = order[np.argsort(pts[order, 0], kind="mergesort")]
+    n = len(order)
+    hull = np.empty(2 * n, dtype=np.int64)
+    k = 0
+    for i in order:
+        while k >= 2 and cross(
+            pts[hull[k - 2], 0], pts[hull[k - 2], 1],
+            pts[hull[k - 1], 0], pts[hull[k - 1], 1],
+            pts[i, 0], pts[i, 1],
+        ) <= 0:
+            k -= 1
+        hull[k] = i
+        k += 1
+    lower = k + 1
+    for j in range(n - 2, -1, -1):
+        i = order[j]
+        while k >= lower and cross(
+            pts[hull[k - 2], 0], pts[hull[k - 2], 1],
+            pts[hull[k - 1], 0], pts[hull[k - 1], 1],
+            pts[i, 0], pts[i, 1],
+        ) <= 0:
+            k -= 1
+        hull[k] = i
+        k += 1
+    return pts[hull[: max(k - 1, 1)]]
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# gpkg.py
+# writing and reading of case layers in shared GeoPackages
+
+import sqlite3
+
+import fiona
+import pandas as pd
+
+__all__ = ["write_layers", "add_columns", "read_columns"]
+
+# seconds to wait for a lock held by another writer
+TIMEOUT = 60
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def write_layers(path, layers):
+    """
+    Write several layers of a case into a GeoPackage.
+
+    Layers are written through fiona (GDAL) within a single GDAL environment,
+    one layer after another. Existing layers of the same name are replaced,
+    other layers are kept. fiona opens a layer, not a dataset, so layers
+    are not written in a single transaction; writes of cases are serialised
+    in the parent process of the case runner (see
+    :func:`~seashore.runner.run_cases`).
+
+    Parameters
+    ----------
+    path : str
+        path to GeoPackage
+    layers : dict
+        GeoDataFrames keyed by layer name
+
+    Examples
+    --------
+    >>> write_layers('data/atlantic.gpkg', {'aguda_blg': buildings, 'aguda_tess': tessellation})
+    """
+    with fiona.Env():
+        for layer, gdf in layers.items():
+            gdf.to_file(path, layer=layer, driver="GPKG")
+
+
+def _sql_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def add_columns(path, layer, df, key="uID"):
+    """
+    Add (or overwrite) attribute columns of an existing GeoPackage layer.
+
+    Values are written directly into the SQLite table of the layer within a
+    single transaction, geometries are not read nor rewritten. Rows are matched
+    on ``key``; nothing is written if any value of ``key`` is not present in
+    the layer (ValueError is raised).
+
+    Triggers of the layer (spatial index and feature count maintained by GDAL)
+    call SQL functions of GDAL, which SQLite cannot resolve outside of it, so
+    they are dropped before the update and created again from their stored
+    definition within the same transaction. Geometries are not updated, so
+    the spatial index stays valid.
+
+    Parameters
+    ----------
+    path : str
+        path to GeoPackage
+    layer : str
+        name of the layer
+    df : DataFrame
+        DataFrame containing ``key`` column and columns to be written
+    key : str (default 'uID')
+        name of unique column present in both ``df`` and ``layer``
+
+    Examples
+    --------
+    >>> add_columns('data/atlantic.gpkg', 'aguda_blg', stats, key='uID')
+    """
+    columns = [c for c in df.columns if c != key]
+
+    con = sqlite3.connect(path, timeout=TIMEOUT, isolation_level=None)
+    try:
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            info = con.execute("PRAGMA table_info({})".format(_quote(layer))).fetchall()
+            existing = {row[1] for row in info}
+            if key not in existing:
+                raise ValueError("Layer {} of {} has no column {}.".format(layer, path, key))
+            pk = [row[1] for row in info if row[5]][0]
+
+            fids = dict(
+                con.execute(
+                    "SELECT {}, {} FROM {}".format(_quote(key), _quote(pk), _quote(layer))
+                )
+            )
+            keys = df[key].tolist()
+            missing = [k for k in keys if k not in fids]
+            if missing:
+                raise ValueError(
+                    "{} values of {} are not present in layer {} of {} (e.g. {}).".format(
+                        len(missing), key, layer, path, missing[:5]
+                    )
+                )
+            fid = [fids[k] for k in keys]
+
+            triggers = con.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?",
+                (layer,),
+            ).fetchall()
+            for name, _ in triggers:
+                con.execute("DROP TRIGGER {}".format(_quote(name)))
+
+            for col in columns:
+                if col not in existing:
+                    con.execute(
+                        "ALTER TABLE {} ADD COLUMN {} {}".format(
+                            _quote(layer), _quote(col), _sql_type(df[col].dtype)
+                        )
+                    )
+
+            # python objects with NULL instead of NaN for sqlite3 binding
+            values = [
+                df[col].astype(object).where(df[col].notna(), None).tolist()
+                for col in columns
+            ]
+            query = "UPDATE {} SET {} WHERE {} = ?".format(
+                _quote(layer),
+                ", ".join("{} = ?".format(_quote(col)) for col in columns),
+                _quote(pk),
+            )
+            con.executemany(query, zip(*values, fid))
+
+            for _, sql in triggers:
+                con.execute(sql)
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+    finally:
+        con.close()
+
+
+def read_columns(path, layer, columns=None):
+    """
+    Read attribute columns of a GeoPackage layer, without geometry.
+
+    Values are read directly from the SQLite table of the layer in the order
+    of features, geometries are not read nor parsed.
+
+    Parameters
+    ----------
+    path : str
+        path to GeoPackage
+    layer : str
+        name of the layer
+    columns : list (default None)
+        columns to be read, None reads all. Columns missing in the layer are
+        skipped.
+
+    Returns
+    -------
+    DataFrame
+
+    Examples
+    --------
+    >>> blg = read_columns('data/atlantic.gpkg', 'aguda_blg', ['uID', 'part', 'min'])
+    """
+    con = sqlite3.connect(path, timeout=TIMEOUT)
+    try:
+        info = con.execute("PRAGMA table_info({})".format(_quote(layer))).fetchall()
+        pk = [row[1] for row in info if row[5]][0]
+        geometry = {
+            row[0]
+            for row in con.execute(
+                "SELECT column_name FROM gpkg_geometry_columns WHERE table_name = ?", (layer,)
+            )
+        }
+        existing = [row[1] for row in info if row[1] != pk and row[1] not in geometry]
+        if columns is None:
+            columns = existing
+        columns = [c for c in columns if c in existing]
+        if not columns:
+            count = con.execute("SELECT COUNT(*) FROM {}".format(_quote(layer))).fetchone()[0]
+            return pd.DataFrame(index=range(count))
+        query = "SELECT {} FROM {} ORDER BY {}".format(
+            ", ".join(_quote(c) for c in columns), _quote(layer), _quote(pk)
+        )
+        return pd.read_sql_query(query, con)
+    finally:
+        con.close()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# instrument.py
+# timing and memory profile of steps of a stage
+
+import glob
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+__all__ = ["Profiler", "write_profile", "read_profiles", "summary", "print_summary"]
+
+# ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def _peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+class Profiler:
+    """
+    Record wall time and peak memory of named steps.
+
+    Each step records its wall time, the increase of peak resident set size of
+    the process (0 if the step did not need more memory than any previous
+    one) and current sizes of inputs.
+
+    Peak resident set size covers all memory of the process (including GEOS
+    and GDAL), but it never decreases. Profiles of cases are comparable only
+    if each case runs in a new process (``run_cases(..., fresh=True)``),
+    otherwise a case processed by a worker after a larger one records no
+    increase.
+
+    Attributes
+    ----------
+    sizes : dict
+        current sizes of inputs (e.g. ``buildings``, ``cells``, ``edges``)
+        recorded with each step
+    records : list
+        recorded steps
+
+    Examples
+    --------
+    >>> prof = Profiler()
+    >>> prof.sizes['buildings'] = len(buildings)
+    >>> with prof('sdsSPW'):
+    ...     profile = street_profile(edges, buildings)
+    >>> prof.frame()
+    """
+
+    def __init__(self):
+        self.sizes = {}
+        self.records = []
+
+    @contextmanager
+    def __call__(self, name):
+        rss = _peak_rss()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {
+                "step": name,
+                "seconds": time.perf_counter() - start,
+                "peak_rss_delta": _peak_rss() - rss,
+            }
+            record.update(self.sizes)
+            self.records.append(record)
+
+    def frame(self):
+        """Recorded steps as a DataFrame (in order of execution)."""
+        return pd.DataFrame(self.records)
+
+
+def _profile_path(case, folder):
+    return os.path.join(folder, "profile", case.part + "_" + case.name)
+
+
+def write_profile(case, profile, folder="data/", format="csv"):
+    """
+    Save profile of a case as ``folder/profile/part_name.csv`` (or ``.parquet``).
+
+    Parameters
+    ----------
+    case : Case
+        profiled case
+    profile : DataFrame
+        profile of a case as returned by :meth:`Profiler.frame`
+    folder : str (default 'data/')
+        data folder
+    format : str (default 'csv')
+        'csv' or 'parquet' (requires pyarrow)
+    """
+    path = _profile_path(case, folder) + "." + format
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    profile = profile.assign(part=case.part, case=case.name)
+    if format == "parquet":
+        profile.to_parquet(path, index=False)
+    else:
+        profile.to_csv(path, index=False)
+
+
+def read_profiles(folder="data/"):
+    """Read all saved profiles into a single DataFrame."""
+    frames = []
+    for path in sorted(glob.glob(os.path.join(folder, "profile", "*"))):
+        if path.endswith(".parquet"):
+            frames.append(pd.read_parquet(path))
+        elif path.endswith(".csv"):
+            frames.append(pd.read_csv(path))
+    if not frames:
+        return pd.DataFrame(columns=["step", "seconds", "peak_rss_delta", "part", "case"])
+    return pd.concat(frames, ignore_index=True, sort=False)
+
+
+def summary(profiles):
+    """
+    Aggregate profiles of cases per step.
+
+    Parameters
+    ----------
+    profiles : DataFrame
+        profiles as returned by :func:`read_profiles`
+
+    Returns
+    -------
+    DataFrame
+        total and maximal time, share of total time and maximal peak RSS
+        increase of each step, sorted by total time
+    """
+    grouped = profiles.groupby("step", sort=False)
+    table = pd.DataFrame(
+        {
+            "total_seconds": grouped.seconds.sum(),
+            "max_seconds": grouped.seconds.max(),
+            "max_peak_rss_delta": grouped.peak_rss_delta.max(),
+        }
+    )
+    table["share"] = table.total_seconds / table.total_seconds.sum()
+    return table.sort_values("total_seconds", ascending=False)
+
+
+def print_summary(profiles, width=50):
+    """
+    Print flame-style summary of profiles (bar of time share of each step).
+
+    Parameters
+    ----------
+    profiles : DataFrame
+        profiles as returned by :func:`read_profiles`
+    width : int (default 50)
+        width of a bar of the whole run
+    """
+    table = summary(profiles)
+    if table.empty:
+        return
+    name = max(len(step) for step in table.index)
+    for step, row in table.iterrows():
+        print(
+            "{:<{}} {:<{}} {:6.1%} {:10.1f} s {:8.0f} MB".format(
+                step,
+                name,
+                "#" * int(round(row.share * width)),
+                width,
+                row.share,
+                row.total_seconds,
+                row.max_peak_rss_delta / 2 ** 20,
+            )
+        )
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# inundation.py
+# flooding of buildings hydrologically connected to the sea
+
+import hashlib
+import heapq
+
+import numpy as np
+import pandas as pd
+import rasterio as rio
+from numba import njit
+from rasterio import features
+from shapely.geometry import box
+
+from .cache import case_fingerprint
+from .dtm import cached_tile, source_stamps
+from .flood import read_window, zonal_stats
+from .store import read_store
+
+__all__ = ["flood_level", "inundation_case", "fingerprint"]
+
+
+@njit(cache=True)
+def _priority_flood(dem, valid, seeds):
+    rows, cols = dem.shape
+    level = np.full(dem.shape, np.inf)
+    done = seeds.copy()
+
+    heap = [(-np.inf, 0)]
+    heap.pop()
+    for i in range(rows):
+        for j in range(cols):
+            if not seeds[i, j]:
+                continue
+            level[i, j] = -np.inf
+            # only seeds along the coast can spread water
+            if seeds[max(i - 1, 0):i + 2, max(j - 1, 0):j + 2].all():
+                continue
+            heap.append((-np.inf, i * cols + j))
+
+    while heap:
+        current, k = heapq.heappop(heap)
+        i, j = k // cols, k % cols
+        for di in range(-1, 2):
+            for dj in range(-1, 2):
+                ni, nj = i + di, j + dj
+                if ni < 0 or nj < 0 or ni >= rows or nj >= cols:
+                    continue
+                if done[ni, nj] or not valid[ni, nj]:
+                    continue
+                done[ni, nj] = True
+                value = max(dem[ni, nj], current)
+                level[ni, nj] = value
+                heapq.heappush(heap, (value, ni * cols + nj))
+    return level
+
+
+def flood_level(dem, seeds, nodata=-999):
+    """
+    Sea level at which each cell of DTM gets flooded from the sea.
+
+    Water spreads from ``seeds`` to neighbouring cells (8-connectivity) lower
+    than the sea level, so a cell is flooded at level L if it is connected to
+    the sea by a path of cells lower than L. Levels of all cells are computed
+    in a single priority flood pass (O(n log n)), ordered by elevation from
+    the sea. Cells lower than their level are depressions not connected to
+    the sea.
+
+    Parameters
+    ----------
+    dem : ndarray
+        2D array of elevation
+    seeds : ndarray
+        2D boolean array of cells of the sea
+    nodata : float (default -999)
+        value of missing cells, which water does not pass (unless seeds)
+
+    Returns
+    -------
+    ndarray
+        2D float array of levels, NaN for seeds and missing cells, inf for
+        cells never reached by water
+
+    Examples
+    --------
+    >>> level = flood_level(array[0], array[0] == -999)
+    >>> flooded = level < 5
+    """
+    dem = np.asarray(dem, dtype=np.float64)
+    valid = (dem != nodata) & ~np.isnan(dem)
+    seeds = np.asarray(seeds, dtype=np.bool_)
+    level = _priority_flood(dem, valid, seeds)
+    level[seeds | ~valid] = np.nan
+    return level
+
+
+def _within(gdf, bounds):
+    """Rows of ``gdf`` intersecting ``bounds`` (found using its spatial index)."""
+    candidates = gdf.iloc[sorted(gdf.sindex.intersection(bounds))]
+    return candidates[candidates.intersects(box(*bounds))]
+
+
+def _bounds(case, buffer):
+    blg = read_store(case, 'blg', ['uID'], geometry=True)
+    return blg, box(*blg.total_bounds).buffer(buffer).bounds
+
+
+def inundation_case(case, grid, sea, mdt='MDT/', buffer=500):
+    """
+    Measure the sea level at which buildings of a case get flooded from the sea.
+
+    The DTM covering buildings of a case (and ``buffer`` around, where water
+    may find its way) is read from tiles intersecting it and flooded from the
+    sea (see :func:`flood_level`). The minimal level within the footprint of
+    a building is the level at which it gets flooded, comparable to ``min``
+    elevation used by the unconnected (bathtub) model.
+
+    Parameters
+    ----------
+    case : Case
+        case to be measured
+    grid : GeoDataFrame
+        grid of DTM tiles (``MDT1m_LiDAR2011_secciona.shp``)
+    sea : GeoDataFrame
+        polygons of the sea (e.g. OSM water polygons) in the CRS of DTM. Only
+        polygons within ``buffer`` around buildings (found using spatial
+        index) are used, cells of DTM they touch are the sea.
+    mdt : str (default 'MDT/')
+        folder containing DTM tiles
+    buffer : float (default 500)
+        distance around buildings included in DTM (in units of CRS)
+
+    Returns
+    -------
+    DataFrame
+        ``uID`` and flood level (``min_conn``) of buildings, NaN for buildings
+        never flooded
+
+    Examples
+    --------
+    >>> sea = gpd.read_file('water_polygons.shp', bbox=bbox).to_crs(grid.crs)
+    >>> levels = inundation_case(case, grid, sea)
+    >>> add_columns(case.path, case.name + '_blg', levels, key='uID')
+    """
+    blg, bounds = _bounds(case, buffer)
+    tiles = _within(grid, bounds)
+    if tiles.empty:
+        raise ValueError("No DTM tile covers case {}.".format(case.name))
+    water = _within(sea, bounds)
+    if water.empty:
+        raise ValueError("No sea within {} around buildings of case {}.".format(
+            buffer, case.name))
+
+    sources = [rio.open(cached_tile(rpart, mdt)) for rpart in tiles.Id_Unidade]
+    try:
+        dem, affine = read_window(sources, bounds)
+        nodata = sources[0].nodata if sources[0].nodata is not None else -999
+    finally:
+        for source in sources:
+            source.close()
+
+    seeds = features.rasterize(((geom, 1) for geom in water.geometry), out_shape=dem.shape,
+                               transform=affine, fill=0, dtype='uint8',
+                               all_touched=True).astype(bool)
+    level = flood_level(dem, seeds, nodata)
+    level[np.isinf(level)] = np.nan
+    stats = zonal_stats(blg.geometry, level, affine)
+    return pd.DataFrame({'uID': blg.uID.values, 'min_conn': stats['min'].values})
+
+
+def fingerprint(case, grid, sea, mdt='MDT/', buffer=500):
+    """
+    Fingerprint of geometries of buildings, DTM tiles and the sea around them.
+
+    DTM tiles are represented by size and modification time of their sources
+    (see :func:`~seashore.dtm.source_stamps`), the sea by a hash of polygons
+    used by :func:`inundation_case`.
+    """
+    _, bounds = _bounds(case, buffer)
+    tiles = _within(grid, bounds)
+    water = _within(sea, bounds)
+    params = {
+        'dtm': source_stamps(sorted(tiles.Id_Unidade), mdt),
+        'sea': hashlib.sha1(b''.join(geom.wkb for geom in water.geometry)).hexdigest(),
+        'buffer': buffer,
+    }
+    return case_fingerprint(case, ['blg'], params=params, subset='geometry')
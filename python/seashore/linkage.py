@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# linkage.py
+# stored linkage of cases and exploration of its cut levels
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.cluster import hierarchy
+from scipy.spatial.distance import pdist, squareform
+from sklearn.metrics import calinski_harabasz_score, silhouette_score
+
+__all__ = ["data_hash", "cached_linkage", "cut_levels"]
+
+
+def data_hash(data, method="ward"):
+    """Hash of values, index and columns of ``data`` and linkage ``method``."""
+    sha = hashlib.sha256()
+    sha.update(method.encode())
+    sha.update(repr(list(data.index)).encode())
+    sha.update(repr(list(data.columns)).encode())
+    sha.update(np.ascontiguousarray(data.values, dtype=np.float64).tobytes())
+    return sha.hexdigest()
+
+
+def cached_linkage(data, method="ward", folder="data/"):
+    """
+    Linkage matrix of ``data``, stored and reused for the same input.
+
+    Linkage is stored in ``folder/.cache/linkage/`` under the hash of
+    standardized data (see :func:`data_hash`) and computed only if the data
+    changed.
+
+    Parameters
+    ----------
+    data : DataFrame
+        standardized characters of cases
+    method : str (default 'ward')
+        linkage method of :func:`scipy.cluster.hierarchy.linkage`
+    folder : str (default 'data/')
+        folder containing the cache
+
+    Returns
+    -------
+    ndarray
+        linkage matrix
+
+    Examples
+    --------
+    >>> Z = cached_linkage(data, 'ward')
+    """
+    path = os.path.join(folder, ".cache", "linkage", data_hash(data, method) + ".npy")
+    if os.path.exists(path):
+        return np.load(path)
+    Z = hierarchy.linkage(data, method)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp.npy"
+    np.save(tmp, Z)
+    os.replace(tmp, path)
+    return Z
+
+
+def cut_levels(Z, data, thresholds=None, k=None):
+    """
+    Flat clusters and their scores for many cut levels of a dendrogram.
+
+    Clusters are labelled as by :func:`scipy.cluster.hierarchy.fcluster`,
+    so labels of a threshold equal ``fcluster(Z, threshold, 'distance')``.
+    Distances between cases are computed once and shared by silhouette
+    scores of all levels.
+
+    Parameters
+    ----------
+    Z : ndarray
+        linkage matrix of ``data``
+    data : DataFrame
+        standardized characters of cases used to compute ``Z``
+    thresholds : list (default None)
+        cophenetic distances to cut the dendrogram at
+    k : list (default None)
+        numbers of clusters to cut the dendrogram into (used if
+        ``thresholds`` is None)
+
+    Returns
+    -------
+    labels : DataFrame
+        cluster of each case (rows) for each level (columns)
+    scores : DataFrame
+        number of clusters (``n_clusters``), ``silhouette`` and
+        ``calinski_harabasz`` scores for each level (NaN if there is only a
+        single cluster or each case forms its own)
+
+    Examples
+    --------
+    >>> labels, scores = cut_levels(Z, data, thresholds=range(10, 31))
+    >>> gdf['cl'] = labels[18].values
+    """
+    if thresholds is not None:
+        levels, criterion = list(thresholds), "distance"
+    elif k is not None:
+        levels, criterion = list(k), "maxclust"
+    else:
+        raise ValueError("Either thresholds or k has to be given.")
+
+    X = np.asarray(data, dtype=np.float64)
+    distances = squareform(pdist(X))
+    labels = pd.DataFrame(
+        {level: hierarchy.fcluster(Z, level, criterion=criterion) for level in levels},
+        index=data.index,
+        columns=levels,
+    )
+
+    scores = pd.DataFrame(index=pd.Index(levels, name=criterion), dtype=float,
+                          columns=["n_clusters", "silhouette", "calinski_harabasz"])
+    for level in levels:
+        n = len(np.unique(labels[level]))
+        scores.loc[level, "n_clusters"] = n
+        if 1 < n < len(X):
+            scores.loc[level, "silhouette"] = silhouette_score(
+                distances, labels[level], metric="precomputed")
+            scores.loc[level, "calinski_harabasz"] = calinski_harabasz_score(X, labels[level])
+    scores["n_clusters"] = scores["n_clusters"].astype(int)
+    return labels, scores
@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# measure.py
+# morphometric elements and primary characters of a single case
+
+import geopandas as gpd
+import libpysal
+import momepy as mm
+import numpy as np
+import pandas as pd
+
+from .cache import case_fingerprint
+from .features import build_features
+from .instrument import Profiler
+from .profile import street_profile
+from .shape import shape_characters
+from .tessellation import tiled_tessellation
+
+__all__ = ["PARAMS", "CaseContext", "measure_case", "fingerprint"]
+
+# parameters influencing results of measure_case
+PARAMS = {
+    "momepy": mm.__version__,
+    "min_size": 100,
+    "profile_distance": 3,
+    "meshedness_radius": 5,
+}
+
+
+class CaseContext:
+    """
+    Intermediate data of a case shared by multiple characters.
+
+    Each orientation, spatial weights matrix and link between elements is
+    computed once, on first access, and reused by all characters requiring it.
+    Orientations and links are indexed by ``uID``, so they remain valid when
+    unlinked elements are dropped or tessellation is re-indexed.
+
+    Parameters
+    ----------
+    buildings : GeoDataFrame
+        GeoDataFrame containing buildings with ``uID``
+    tessellation : GeoDataFrame
+        GeoDataFrame containing morphological tessellation with ``uID``
+
+    Attributes
+    ----------
+    buildings : GeoDataFrame
+        current buildings (reassign after dropping unlinked buildings)
+    tessellation : GeoDataFrame
+        current tessellation
+    links : DataFrame
+        IDs of street network edges (``nID``) indexed by ``uID``
+    """
+
+    def __init__(self, buildings, tessellation):
+        self.buildings = buildings
+        self.tessellation = tessellation
+        self.links = pd.DataFrame(index=pd.Index(buildings.uID.values, name='uID'))
+        self._cache = {}
+
+    def _cached(self, key, func):
+        if key not in self._cache:
+            self._cache[key] = func()
+        return self._cache[key]
+
+    def orientation(self, gdf, element='buildings'):
+        """
+        Orientation of buildings or cells aligned with the index of ``gdf``.
+
+        Parameters
+        ----------
+        gdf : GeoDataFrame
+            buildings or tessellation (or their subset) with ``uID``
+        element : str (default 'buildings')
+            'buildings' or 'tessellation'
+
+        Returns
+        -------
+        Series
+        """
+        def _orientation():
+            source = getattr(self, element)
+            return pd.Series(mm.Orientation(source).series.values, index=source.uID.values)
+
+        series = self._cached(element + '_orientation', _orientation)
+        return pd.Series(series.loc[gdf.uID].values, index=gdf.index)
+
+    @property
+    def cell_weights(self):
+        """Queen contiguity weights of tessellation of order 1 indexed by ``uID``."""
+        return self._cached('cell_weights', lambda: mm.sw_high(k=1, gdf=self.tessellation, ids='uID'))
+
+    @property
+    def block_weights(self):
+        """Weights joining all current buildings into a single regime."""
+        def _block_weights():
+            regimes = np.ones(len(self.buildings))
+            return libpysal.weights.block_weights(regimes, ids=self.buildings.uID.values)
+
+        return self._cached('block_weights', _block_weights)
+
+
+def measure_case(case, tile_size=None, tile_workers=1, profile_distance=None, profile=False):
+    """
+    Generate tessellation and blocks and measure primary characters of a case.
+
+    Manually assigned attributes (``part`` of buildings, ``case`` of edges,
+    see :data:`~seashore.store.MANUAL`) are not inputs of this stage. ``part``
+    present in ``name_blg`` is carried over to the saved GeoPackage layer, but
+    it is neither part of the feature matrix nor of the columnar store, so
+    later stages always read manual attributes from GeoPackages.
+
+    Parameters
+    ----------
+    case : Case
+        case to be measured
+    tile_size : float (default None)
+        if set, tessellation is generated in tiles of given size
+        (see :func:`~seashore.tessellation.tiled_tessellation`)
+    tile_workers : int (default 1)
+        number of worker processes tessellating tiles
+    profile_distance : float (default None)
+        distance between ticks of street profile, None uses
+        ``PARAMS['profile_distance']``
+    profile : bool (default False)
+        return also time and memory profile of each step under 'profile' key
+        (see :class:`~seashore.instrument.Profiler`)
+
+    Returns
+    -------
+    dict
+        GeoDataFrames keyed by layer suffix ('blg', 'tess', 'str', 'blocks')
+        and building-level feature matrix under 'features'
+        (see :func:`~seashore.features.build_features`)
+    """
+    prof = Profiler()
+    path, l = case.path, case.name + "_blg"
+
+    with prof('read_blg'):
+        buildings = gpd.read_file(path, layer=l)
+        buildings = buildings.explode().reset_index(drop=True)  # avoid MultiPolygons
+        buildings['uID'] = mm.unique_id(buildings)
+        try:
+            buildings = buildings.drop(columns=['Buildings', 'id'])
+        except KeyError:
+            buildings = buildings[['uID', 'geometry']]
+    prof.sizes['buildings'] = len(buildings)
+
+    # Generate morphological tessellation
+    with prof('Tessellation'):
+        limit = gpd.read_file(path, layer=l[:-3] + 'case').geometry[0]
+        if tile_size:
+            tessellation = tiled_tessellation(buildings, 'uID', limit, tile_size=tile_size,
+                                              workers=tile_workers)
+        else:
+            tess = mm.Tessellation(buildings, 'uID', limit=limit)
+            tessellation = tess.tessellation
+    prof.sizes['cells'] = len(tessellation)
+
+    ctx = CaseContext(buildings, tessellation)
+
+    # Measure individual characters
+    with prof('shape_blg'):
+        shape = shape_characters(buildings.geometry)  # equivalent of respective momepy classes
+        buildings['sdbAre'] = shape['area']
+        buildings['sdbPer'] = shape['perimeter']
+        buildings['ssbCCo'] = shape['circular_compactness']
+        buildings['ssbCor'] = shape['corners'].astype(int)
+        buildings['ssbSqu'] = shape['squareness']
+        buildings['ssbERI'] = shape['eri']
+        buildings['ssbElo'] = shape['elongation']
+        buildings['ssbCCD'] = shape['centroid_corners']
+    with prof('orientation'):
+        ctx.orientation(buildings)
+        ctx.orientation(tessellation, 'tessellation')
+    with prof('stbCeA'):
+        buildings['stbCeA'] = mm.CellAlignment(buildings, tessellation,
+                                               ctx.orientation(buildings),
+                                               ctx.orientation(tessellation, 'tessellation'), 'uID', 'uID').series
+    with prof('mtbSWR'):
+        buildings['mtbSWR'] = mm.SharedWallsRatio(buildings, 'uID').series
+    with prof('cell_weights'):
+        ctx.cell_weights
+    with prof('mtbAli'):
+        buildings['mtbAli'] = mm.Alignment(buildings, ctx.cell_weights, 'uID', ctx.orientation(buildings)).series
+    with prof('mtbNDi'):
+        buildings['mtbNDi'] = mm.NeighborDistance(buildings, ctx.cell_weights, 'uID').series
+
+    with prof('shape_tess'):
+        shape = shape_characters(tessellation.geometry)
+        tessellation['sdcLAL'] = shape['longest_axis']
+        tessellation['sdcAre'] = shape['area']
+        tessellation['sscERI'] = shape['eri']
+    with prof('sicCAR'):
+        tessellation['sicCAR'] = mm.AreaRatio(tessellation, buildings, 'sdcAre', 'sdbAre', 'uID').series
+
+    with prof('ldbPWL'):
+        buildings['ldbPWL'] = mm.PerimeterWall(buildings).series
+
+    with prof('read_str'):
+        edges = gpd.read_file(path, layer=l[:-3] + 'str')
+
+        edges = edges.loc[~(edges.geom_type != "LineString")].explode().reset_index(drop=True)
+    with prof('network_false_nodes'):
+        edges = mm.network_false_nodes(edges)
+        edges['nID'] = mm.unique_id(edges)
+    prof.sizes['edges'] = len(edges)
+
+    with prof('get_network_id'):
+        buildings['nID'] = mm.get_network_id(buildings, edges, 'nID', min_size=PARAMS['min_size'])
+        ctx.links['nID'] = buildings.set_index('uID').nID
+
+    # merge and drop unlinked
+    tessellation = tessellation.drop(columns='nID', errors='ignore').merge(ctx.links.nID.reset_index(), on='uID')
+    tessellation = tessellation[~tessellation.isna().any(axis=1)]
+    buildings = buildings[~buildings.isna().any(axis=1)]
+    ctx.buildings, ctx.tessellation = buildings, tessellation
+    prof.sizes.update(buildings=len(buildings), cells=len(tessellation))
+
+    with prof('stbSAl'):
+        buildings['stbSAl'] = mm.StreetAlignment(buildings, edges, ctx.orientation(buildings), network_id='nID').series
+    with prof('stcSAl'):
+        tessellation['stcSAl'] = mm.StreetAlignment(tessellation, edges, ctx.orientation(tessellation, 'tessellation'), network_id='nID').series
+
+    with prof('sdsLen'):
+        edges['sdsLen'] = mm.Perimeter(edges).series
+    with prof('sssLin'):
+        edges['sssLin'] = mm.Linearity(edges).series
+
+    with prof('StreetProfile'):
+        if profile_distance is None:
+            profile_distance = PARAMS['profile_distance']
+        street = street_profile(edges, buildings, distance=profile_distance)  # equivalent of mm.StreetProfile
+        edges['sdsSPW'] = street.w
+        edges['stsOpe'] = street.o
+        edges['svsSDe'] = street.wd
+
+    with prof('sdsAre'):
+        edges['sdsAre'] = mm.Reached(edges, tessellation, 'nID', 'nID', mode='sum').series
+    with prof('sdsBAr'):
+        edges['sdsBAr'] = mm.Reached(edges, buildings, 'nID', 'nID', mode='sum').series
+
+    with prof('sisBpM'):
+        edges['sisBpM'] = mm.Count(edges, buildings, 'nID', 'nID', weighted=True).series
+
+    with prof('block_weights'):
+        ctx.block_weights
+    with prof('ltcBuA'):
+        buildings['ltcBuA'] = mm.BuildingAdjacency(buildings, ctx.block_weights, 'uID').series
+
+    with prof('meshedness'):
+        G = mm.gdf_to_nx(edges)
+
+        G = mm.meshedness(G, radius=PARAMS['meshedness_radius'], name='meshedness')
+        mm.mean_nodes(G, 'meshedness')
+
+        edges = mm.nx_to_gdf(G, points=False)
+
+    if 'bID' in buildings.columns:
+        buildings = buildings.drop(columns='bID')
+
+    # Generate blocks
+    with prof('Blocks'):
+        gen_blocks = mm.Blocks(tessellation, edges, buildings, 'bID', 'uID')
+        blocks = gen_blocks.blocks
+        buildings['bID'] = gen_blocks.buildings_id
+        tessellation['bID'] = gen_blocks.tessellation_id
+    prof.sizes['blocks'] = len(blocks)
+
+    with prof('shape_blocks'):
+        shape = shape_characters(blocks.geometry)
+        blocks['ldkAre'] = shape['area']
+        blocks['lskElo'] = shape['elongation']
+    with prof('likGra'):
+        blocks['likGra'] = mm.Count(blocks, buildings, 'bID', 'bID', weighted=True).series
+
+    with prof('features'):
+        features = build_features(buildings, edges, tessellation, blocks)
+
+    layers = {'blg': buildings, 'tess': tessellation, 'str': edges, 'blocks': blocks,
+              'features': features}
+    if profile:
+        layers['profile'] = prof.frame()
+    return layers
+
+
+def fingerprint(case, profile_distance=None, tile_size=None):
+    """
+    Fingerprint of geometries of case layers and of :data:`PARAMS`.
+
+    Computed from the layers as saved after :func:`measure_case`, so it stays
+    the same until the case is re-digitised. ``profile_distance`` overriding
+    the default and ``tile_size`` of tiled tessellation are included in
+    parameters, so tiled and monolithic tessellations are cached separately.
+    Manually assigned attributes are deliberately excluded, as they do not
+    influence this stage; stages using them hash them separately (e.g.
+    :func:`~seashore.features.features_fingerprint`).
+    """
+    params = dict(PARAMS)
+    if profile_distance is not None:
+        params['profile_distance'] = profile_distance
+    if tile_size is not None:
+        params['tile_size'] = tile_size
+    return case_fingerprint(case, ['blg', 'str', 'case'], params=params, subset='geometry')
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# orientation.py
+# orientation of seashore streets towards a wind rose
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+__all__ = ["DIRECTIONS", "azimuth", "deviation", "segments", "wind_exposure"]
+
+# directions of 16-point wind rose (degrees clockwise from north)
+DIRECTIONS = np.arange(0, 360, 22.5)
+
+
+def azimuth(x0, y0, x1, y1):
+    """Azimuth of segments (degrees clockwise from north)."""
+    return np.degrees(np.arctan2(np.asarray(x1) - x0, np.asarray(y1) - y0))
+
+
+def deviation(azimuths, directions):
+    """
+    Deviation of segments from wind directions.
+
+    Segments are not oriented, so the deviation is the angle between the
+    axis of a segment and the axis of wind, divided by 90 degrees: 0 for
+    segments parallel to wind, 1 for perpendicular ones. For a single
+    segment and direction, it equals ``wind_issue(line, wind_angle)`` of
+    ``06_Orientation_towards_wind.ipynb``.
+
+    Parameters
+    ----------
+    azimuths : array_like
+        azimuths of segments (degrees)
+    directions : array_like
+        wind directions (degrees)
+
+    Returns
+    -------
+    ndarray
+        array of shape (segments, directions)
+
+    Examples
+    --------
+    >>> deviation(azimuth(x0, y0, x1, y1), DIRECTIONS)
+    """
+    diff = np.mod(np.asarray(azimuths, dtype=float)[:, None] - np.asarray(directions)[None, :], 180)
+    return np.minimum(diff, 180 - diff) / 90
+
+
+def segments(geoms):
+    """
+    Segments between consecutive vertices of (Multi)LineStrings.
+
+    Returns
+    -------
+    coords : ndarray
+        (n, 4) array of x0, y0, x1, y1 of segments
+    index : ndarray
+        position of geometry of each segment
+    """
+    coords = []
+    index = []
+    for i, geom in enumerate(geoms):
+        if geom is None or geom.is_empty:
+            continue
+        lines = geom.geoms if geom.geom_type == "MultiLineString" else [geom]
+        for line in lines:
+            array = np.asarray(line.coords)[:, :2]
+            coords.append(np.hstack([array[:-1], array[1:]]))
+            index.append(np.full(len(array) - 1, i))
+    if not coords:
+        return np.empty((0, 4)), np.empty(0, dtype=np.int64)
+    return np.concatenate(coords), np.concatenate(index)
+
+
+def wind_exposure(cases, directions=DIRECTIONS, frequencies=None):
+    """
+    Length-weighted deviation of seashore streets of cases from a wind rose.
+
+    All segments of seashore streets (``case`` equal to 1, read from the
+    ``name_str`` layer of GeoPackage, where it is assigned manually) of all
+    cases are compared to all wind directions at once. Deviation of a case
+    from a direction is the mean deviation of its segments (see
+    :func:`deviation`) weighted by their length. Exposure to the wind rose is
+    the mean of deviations weighted by frequency of directions.
+
+    Parameters
+    ----------
+    cases : list
+        list of :class:`~seashore.runner.Case`
+    directions : array_like (default DIRECTIONS)
+        wind directions (degrees)
+    frequencies : array_like (default None)
+        frequency of each direction, None weights directions equally
+
+    Returns
+    -------
+    DataFrame
+        deviation of each case (rows) from each direction (columns) and
+        frequency-weighted ``rose`` deviation
+
+    Examples
+    --------
+    >>> exposure = wind_exposure(list_cases('data/'), [0, 45, 90], [0.2, 0.5, 0.3])
+    """
+    directions = np.asarray(directions, dtype=float)
+    frequencies = np.ones(len(directions)) if frequencies is None else np.asarray(frequencies)
+
+    coords, codes = [], []
+    for code, case in enumerate(cases):
+        streets = gpd.read_file(case.path, layer=case.name + '_str')
+        if 'case' not in streets.columns:
+            raise ValueError("Attribute 'case' (seashore street) is missing in layer {}."
+                             .format(case.name + '_str'))
+        seg, _ = segments(streets.geometry[streets['case'] == 1])
+        coords.append(seg)
+        codes.append(np.full(len(seg), code))
+    coords, codes = np.concatenate(coords), np.concatenate(codes)
+
+    length = np.hypot(coords[:, 2] - coords[:, 0], coords[:, 3] - coords[:, 1])
+    dev = deviation(azimuth(*coords.T), directions)
+    n = len(cases)
+    weighted = np.stack([np.bincount(codes, dev[:, j] * length, minlength=n)
+                         for j in range(len(directions))], axis=1)
+    with np.errstate(invalid='ignore'):
+        table = weighted / np.bincount(codes, length, minlength=n)[:, None]
+
+    exposure = pd.DataFrame(table, index=[case.name for case in cases], columns=directions)
+    exposure['rose'] = table @ frequencies / frequencies.sum()
+    return exposure
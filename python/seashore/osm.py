@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# osm.py
+# offline retrieval of street networks from a local OpenStreetMap extract
+
+import os
+import re
+import tempfile
+
+import geopandas as gpd
+import osmium
+import osmnx as ox
+from shapely.geometry import box
+
+from .summary import geometry_summary
+
+__all__ = ["load_extract", "clip_network"]
+
+# tag filter of osmnx 'drive' network_type, clauses ["key"!~"regex"]
+_DRIVE_FILTER = ox.downloader.get_osm_filter("drive")
+_CLAUSE = re.compile(r'\["([^"]+)"!~"([^"]*)"\]')
+
+
+def _parse_filter(osm_filter):
+    """Parse Overpass filter of osmnx into (key, compiled regex) pairs."""
+    clauses = _CLAUSE.findall(osm_filter)
+    if _CLAUSE.sub("", osm_filter):
+        raise ValueError("Unsupported clauses in osmnx filter: {}".format(osm_filter))
+    return [(key, re.compile(pattern)) for key, pattern in clauses]
+
+
+_DRIVE = _parse_filter(_DRIVE_FILTER)
+
+
+def _is_drive(tags):
+    """
+    Check whether OSM way tags pass osmnx 'drive' network_type filter.
+
+    Clauses of the Overpass filter of osmnx are applied as Overpass does: a
+    way with the ``highway`` tag passes unless the value of any filtered key
+    matches its regular expression (unanchored search, as ``highway=services``
+    is excluded by ``service``).
+    """
+    if "highway" not in tags:
+        return False
+    for key, pattern in _DRIVE:
+        value = tags.get(key)
+        if value is not None and pattern.search(value):
+            return False
+    return True
+
+
+class _DriveWays(osmium.SimpleHandler):
+    """Collect drivable ways with a node within any of bounding boxes."""
+
+    def __init__(self, bboxes):
+        super().__init__()
+        self.bboxes = bboxes
+        self.ways = {key: [] for key in bboxes}
+        self.tags = {}
+        self.refs = {}
+        self.locations = {}
+
+    def way(self, w):
+        if not _is_drive(w.tags):
+            return
+        keys = set()
+        nodes = [n for n in w.nodes if n.location.valid()]
+        for key, (west, south, east, north) in self.bboxes.items():
+            for n in nodes:
+                if west <= n.lon <= east and south <= n.lat <= north:
+                    keys.add(key)
+                    break
+        if not keys:
+            return
+        for key in keys:
+            self.ways[key].append(w.id)
+        self.tags[w.id] = {tag.k: tag.v for tag in w.tags}
+        self.refs[w.id] = [n.ref for n in nodes]
+        for n in nodes:
+            self.locations[n.ref] = (n.lon, n.lat)
+
+
+def _edges(collector, key, crs, folder):
+    """Edges of drivable ways collected for a bounding box, as osmnx returns them."""
+    ways = collector.ways[key]
+    if not ways:
+        return gpd.GeoDataFrame(geometry=gpd.GeoSeries([]), crs="EPSG:{}".format(crs))
+
+    xml = os.path.join(folder, "drive.osm")
+    writer = osmium.SimpleWriter(xml)
+    try:
+        nodes = sorted({ref for way in ways for ref in collector.refs[way]})
+        for ref in nodes:
+            writer.add_node(osmium.osm.mutable.Node(id=ref, location=collector.locations[ref]))
+        for way in sorted(ways):
+            writer.add_way(
+                osmium.osm.mutable.Way(id=way, nodes=collector.refs[way], tags=collector.tags[way])
+            )
+    finally:
+        writer.close()
+
+    streets_graph = ox.graph_from_file(xml, simplify=True, retain_all=True)
+    os.remove(xml)
+    streets_graph = ox.get_undirected(streets_graph)
+    edges = ox.save_load.graph_to_gdfs(
+        streets_graph,
+        nodes=False,
+        edges=True,
+        node_geometry=False,
+        fill_edge_geometry=True,
+    )
+    edges = edges.to_crs(epsg=crs).reset_index(drop=True)
+    edges.sindex  # build spatial index once, reused by clip_network
+    return edges
+
+
+def load_extract(filename, bounds, crs=3763):
+    """
+    Load drivable street networks around cases from local OpenStreetMap extract.
+
+    The extract (e.g. mainland Portugal) is read once. Ways passing the osmnx
+    'drive' network_type filter with a node within any of ``bounds`` are
+    kept in memory with their nodes, the rest of the extract is not. A graph
+    is then built for each of ``bounds`` from its ways only and converted to
+    the same undirected, simplified edges as ``osmnx.graph_from_point``
+    returns. Ways are kept whole, so edges may extend beyond ``bounds``.
+
+    Parameters
+    ----------
+    filename : str
+        path to OSM PBF (``.osm.pbf``) or XML (``.osm``) extract
+    bounds : dict
+        bounding boxes (minx, miny, maxx, maxy) in ``crs`` keyed by case
+        (e.g. the convex hull of buildings buffered by the clipping distance
+        of :func:`clip_network`)
+    crs : int (default 3763)
+        EPSG code of the CRS of ``bounds`` and of resulting edges
+
+    Returns
+    -------
+    dict
+        GeoDataFrames of street network edges (with spatial index) keyed as
+        ``bounds``
+
+    Examples
+    --------
+    >>> networks = load_extract('OSM/portugal-latest.osm.pbf', {'aguda': bounds})
+    >>> clipped_edges = clip_network(networks['aguda'], blg)
+    """
+    keys = list(bounds)
+    boxes = gpd.GeoSeries([box(*bounds[key]) for key in keys], crs="EPSG:{}".format(crs))
+    lonlat = boxes.to_crs(epsg=4326).bounds.values
+    collector = _DriveWays({key: tuple(b) for key, b in zip(keys, lonlat)})
+    collector.apply_file(filename, locations=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        return {key: _edges(collector, key, crs, tmp) for key in keys}
+
+
+def clip_network(edges, buildings, distance=2500):
+    """
+    Clip street network within given distance around buildings convex hull.
+
+    Only edges returned by spatial index query are intersected with the clipping
+    polygon.
+
+    Parameters
+    ----------
+    edges : GeoDataFrame
+        GeoDataFrame of street network edges with spatial index
+        (e.g. result of :func:`load_extract`)
+    buildings : GeoDataFrame
+        GeoDataFrame containing building footprints of a case
+    distance : float (default 2500)
+        buffer distance around convex hull of buildings (computed from
+        vertices, see :func:`~seashore.summary.geometry_summary`)
+
+    Returns
+    -------
+    GeoSeries
+        clipped street network
+    """
+    # convex hull of all vertices equals the hull of their union
+    clip = geometry_summary(buildings.geometry)['hull'].buffer(distance)
+    if edges.empty:
+        return edges.geometry
+
+    candidates = sorted(edges.sindex.intersection(clip.bounds))
+    clipped_edges = edges.geometry.iloc[candidates].intersection(clip)
+
+    return clipped_edges.loc[~clipped_edges.is_empty]
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# profile.py
+# vectorized street profile
+
+import numpy as np
+import pandas as pd
+
+from .geometry import flatten
+
+__all__ = ["street_profile"]
+
+
+def _lines(geoms):
+    """
+    Extract vertices of LineStrings into a flat array with offsets.
+
+    Repeated consecutive vertices are dropped, so that no segment of a line
+    has zero length.
+    """
+    coords = [np.asarray(geom.coords)[:, :2] for geom in geoms]
+    counts = np.array([len(c) for c in coords], dtype=np.int64)
+    coords = np.concatenate(coords) if coords else np.empty((0, 2))
+
+    keep = np.ones(len(coords), dtype=bool)
+    keep[1:] = (np.diff(coords, axis=0) != 0).any(axis=1)
+    keep[np.cumsum(counts) - counts] = True
+    line = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(line[keep], minlength=len(counts)))
+    return coords[keep], offsets
+
+
+def _chainage(coords, offsets, distance):
+    """
+    Points along lines placed the way momepy.StreetProfile places them.
+
+    Each line gets its start, points every ``distance`` (strictly shorter than
+    the length of the line) and its end.
+
+    Returns
+    -------
+    points : ndarray
+        (n, 2) array of points
+    line : ndarray
+        index of the line of each point
+    order : ndarray
+        order of each point along its line
+    """
+    n_lines = len(offsets) - 1
+    segment = np.hypot(*np.diff(coords, axis=0).T)
+    # segments joining consecutive lines are not part of any line
+    segment[offsets[1:-1] - 1] = 0
+    cumulative = np.concatenate([[0], np.cumsum(segment)])
+    start = cumulative[offsets[:-1]]
+    length = cumulative[offsets[1:] - 1] - start
+
+    steps = np.floor(length / distance).astype(np.int64) + 1
+    line = np.repeat(np.arange(n_lines), steps)
+    k = np.arange(len(line)) - np.repeat(np.cumsum(steps) - steps, steps)
+    along = k * distance
+    keep = (k > 0) & (along < length[line])
+    line, along = line[keep], along[keep]
+
+    # locate each point on a segment of its line and interpolate
+    position = start[line] + along
+    vertex = np.searchsorted(cumulative, position, side="right") - 1
+    vertex = np.clip(vertex, offsets[line], offsets[line + 1] - 2)
+    ratio = (position - cumulative[vertex]) / segment[vertex]
+    interpolated = coords[vertex] + ratio[:, None] * (coords[vertex + 1] - coords[vertex])
+
+    points = np.concatenate([coords[offsets[:-1]], interpolated, coords[offsets[1:] - 1]])
+    line = np.concatenate([np.arange(n_lines), line, np.arange(n_lines)])
+    kind = np.concatenate([np.zeros(n_lines), np.ones(len(along)), np.full(n_lines, 2)])
+    sort = np.lexsort((kind, line))
+    line = line[sort]
+    counts = np.bincount(line, minlength=n_lines)
+    order = np.arange(len(line)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return points[sort], line, order
+
+
+def _ticks(points, line, order, tick_length):
+    """
+    Perpendicular ticks of momepy.StreetProfile.
+
+    Tick at each point is perpendicular to the chord from the previous point
+    (the first one to the chord towards the second point). Returns starts
+    (points on the street) and ends of left and right ticks.
+    """
+    previous = np.where(order == 0, np.arange(len(line)), np.arange(len(line)) - 1)
+    following = np.where(order == 0, np.arange(len(line)) + 1, np.arange(len(line)))
+    diff = points[following] - points[previous]
+    angle = np.degrees(np.arctan2(diff[:, 1], diff[:, 0]))
+
+    bearing = np.radians(angle + 90)
+    left = points + tick_length / 2 * np.column_stack([np.cos(bearing), np.sin(bearing)])
+    diff = points - left
+    bearing = np.radians(np.degrees(np.arctan2(diff[:, 1], diff[:, 0])))
+    right = left + tick_length * np.column_stack([np.cos(bearing), np.sin(bearing)])
+    return points, left, right
+
+
+def _bounds(a, b):
+    return np.column_stack([np.minimum(a, b), np.maximum(a, b)])
+
+
+def _tick_walls(sindex, ticks, walls, wall_first, wall_count):
+    """
+    Pairs of ticks and exterior walls of buildings with overlapping bounds.
+
+    Buildings are queried from their spatial index by the bounds of each tick
+    (as :func:`~seashore.osm.clip_network` queries edges) and expanded to
+    their walls, which are kept if their bounds overlap the tick.
+
+    Returns
+    -------
+    i, j : ndarray
+        indices of ticks in ``ticks`` and walls in ``walls``
+    """
+    found = [np.fromiter(sindex.intersection(tuple(bounds)), dtype=np.int64)
+             for bounds in ticks]
+    tick = np.repeat(np.arange(len(ticks)), [len(f) for f in found])
+    building = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    counts = wall_count[building]
+    i = np.repeat(tick, counts)
+    j = np.repeat(wall_first[building], counts) + (
+        np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    )
+    overlap = (
+        (ticks[i, 0] <= walls[j, 2])
+        & (ticks[i, 2] >= walls[j, 0])
+        & (ticks[i, 1] <= walls[j, 3])
+        & (ticks[i, 3] >= walls[j, 1])
+    )
+    return i[overlap], j[overlap]
+
+
+def _intersections(p, e, q, r):
+    """
+    Intersections of segments p-e and q-r (pairwise).
+
+    Returns mask of pairs intersecting in a single point, distance of the
+    intersection from ``p`` and mask of pairs overlapping along a line.
+    """
+    d1 = e - p
+    d2 = r - q
+    qp = q - p
+    denom = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (qp[:, 0] * d2[:, 1] - qp[:, 1] * d2[:, 0]) / denom
+        u = (qp[:, 0] * d1[:, 1] - qp[:, 1] * d1[:, 0]) / denom
+    mask = (denom != 0) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+    point = q + u[:, None] * d2
+
+    collinear = (denom == 0) & (qp[:, 0] * d1[:, 1] - qp[:, 1] * d1[:, 0] == 0)
+    length = (d1 ** 2).sum(axis=1)
+    tq = (qp * d1).sum(axis=1) / length
+    tr = ((r - p) * d1).sum(axis=1) / length
+    overlap = collinear & (
+        np.minimum(np.maximum(tq, tr), 1) > np.maximum(np.minimum(tq, tr), 0)
+    )
+    return mask, np.hypot(*(point - p).T), overlap
+
+
+def street_profile(edges, buildings, distance=10, tick_length=50):
+    """
+    Measure street profile width, its deviation and openness.
+
+    Vectorized equivalent of :class:`momepy.StreetProfile` (v0.1.1) without
+    heights. Ticks of all streets are generated as a single array, matched to
+    exterior walls of buildings found by the spatial index of ``buildings``
+    and intersected pairwise. Distances are then reduced per street by grouped operations.
+
+    Follows momepy in details: each tick measures the distance from the
+    street to the nearest wall, a tick crossing walls more than once is
+    counted as the right one and a street with buildings only on one side
+    gets ``tick_length / 2`` as the width of the open side.
+
+    Parameters
+    ----------
+    edges : GeoDataFrame
+        GeoDataFrame containing streets (LineStrings)
+    buildings : GeoDataFrame
+        GeoDataFrame containing buildings along the streets (Polygons)
+    distance : float (default 10)
+        distance between perpendicular ticks (smaller is more precise, larger
+        is faster)
+    tick_length : float (default 50)
+        length of ticks
+
+    Returns
+    -------
+    DataFrame
+        DataFrame with the index of ``edges`` and columns ``w`` (width),
+        ``wd`` (width deviation) and ``o`` (openness)
+
+    Examples
+    --------
+    >>> profile = street_profile(edges, buildings, distance=3)
+    >>> edges['sdsSPW'] = profile.w
+    """
+    n_edges = len(edges)
+    coords, offsets = _lines(edges.geometry)
+    points, line, order = _chainage(coords, offsets, distance)
+    start, left, right = _ticks(points, line, order, tick_length)
+    n_ticks = np.bincount(line, minlength=n_edges)
+
+    # tick sides, 0 left, 1 right
+    tick_start = np.concatenate([start, start])
+    tick_end = np.concatenate([left, right])
+    tick_side = np.repeat([0, 1], len(start))
+    tick_line = np.concatenate([line, line])
+
+    # exterior walls of buildings
+    wall_coords, ring_offsets, geom_offsets, exterior, _ = flatten(buildings.geometry)
+    ring_geom = np.repeat(np.arange(len(buildings)), np.diff(geom_offsets))[exterior]
+    ring_start = ring_offsets[:-1][exterior]
+    n_walls = np.diff(ring_offsets)[exterior] - 1
+    walls = np.repeat(ring_start, n_walls) + (
+        np.arange(n_walls.sum()) - np.repeat(np.cumsum(n_walls) - n_walls, n_walls)
+    )
+    wall_geom = np.repeat(ring_geom, n_walls)
+    wall_start, wall_end = wall_coords[walls], wall_coords[walls + 1]
+
+    columns = {"w": np.full(n_edges, float(tick_length)), "wd": np.zeros(n_edges),
+               "o": np.ones(n_edges)}
+    if len(walls) == 0 or len(tick_start) == 0:
+        return pd.DataFrame(columns, index=edges.index)
+
+    # walls of each building are contiguous
+    wall_count = np.bincount(wall_geom, minlength=len(buildings))
+    wall_first = np.cumsum(wall_count) - wall_count
+    i, j = _tick_walls(
+        buildings.sindex,
+        _bounds(tick_start, tick_end),
+        _bounds(wall_start, wall_end),
+        wall_first,
+        wall_count,
+    )
+    mask, dist, overlap = _intersections(
+        tick_start[i], tick_end[i], wall_start[j], wall_end[j]
+    )
+    hits = pd.DataFrame({"tick": i[mask], "building": wall_geom[j[mask]],
+                         "dist": np.round(dist[mask], 9)})
+    # intersection points of a tick with a single building are unique
+    # (a vertex is shared by two walls)
+    hits = hits.drop_duplicates()
+    # momepy ignores buildings overlapping the tick along a wall (intersection
+    # is not a point)
+    overlaps = pd.MultiIndex.from_arrays([i[overlap], wall_geom[j[overlap]]])
+    hits = hits[~pd.MultiIndex.from_frame(hits[["tick", "building"]]).isin(overlaps)]
+    per_tick = hits.groupby("tick").dist.agg(["min", "count"])
+    tick = per_tick.index.values
+    side = np.where(per_tick["count"].values > 1, 1, tick_side[tick])
+    hit_line = tick_line[tick]
+    hit_dist = per_tick["min"].values
+
+    n_left = np.bincount(hit_line[side == 0], minlength=n_edges)
+    n_right = np.bincount(hit_line[side == 1], minlength=n_edges)
+    n_hits = n_left + n_right
+    total = np.bincount(hit_line, weights=hit_dist, minlength=n_edges)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / n_hits
+        deviation = np.sqrt(
+            np.bincount(hit_line, weights=(hit_dist - mean[hit_line]) ** 2, minlength=n_edges)
+            / n_hits
+        )
+
+    both = (n_left > 0) & (n_right > 0)
+    one = (n_hits > 0) & ~both
+    columns["w"][both] = 2 * mean[both]
+    columns["w"][one] = mean[one] + tick_length / 2
+    columns["wd"][n_hits > 0] = deviation[n_hits > 0]
+    columns["o"] = 1 - n_hits / (2 * n_ticks)
+    return pd.DataFrame(columns, index=edges.index)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# runner.py
+# parallel execution of per-case stages
+
+import collections
+import multiprocessing
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import fiona
+
+__all__ = ["PARTS", "Case", "list_cases", "run_cases"]
+
+PARTS = ["atlantic", "preatl", "premed", "med"]
+
+Case = collections.namedtuple("Case", ["part", "path", "name"])
+Case.__doc__ = """
+Single case study stored as a set of ``name_*`` layers in GeoPackage ``path``.
+"""
+
+
+def list_cases(folder="data/", parts=PARTS):
+    """
+    List cases stored in GeoPackages of all parts.
+
+    Each case is identified by its ``name_blg`` layer.
+
+    Parameters
+    ----------
+    folder : str (default 'data/')
+        folder containing ``part.gpkg`` files
+    parts : list (default PARTS)
+        names of GeoPackages
+
+    Returns
+    -------
+    list
+        list of :class:`Case` in the order of parts and layers
+
+    Examples
+    --------
+    >>> cases = list_cases('data/')
+    >>> cases[0]
+    Case(part='atlantic', path='data/atlantic.gpkg', name='aguda')
+    """
+    cases = []
+    for part in parts:
+        path = folder + part + ".gpkg"
+        for layer in fiona.listlayers(path):
+            if "blg" in layer:
+                cases.append(Case(part, path, layer[:-4]))
+    return cases
+
+
+def _call(args):
+    """Run ``func(case, **kwargs)`` in a worker, returning traceback on failure."""
+    func, case, kwargs = args
+    try:
+        return case, func(case, **kwargs), None
+    except Exception:
+        return case, None, traceback.format_exc()
+
+
+def run_cases(func, cases, workers=None, callback=None, fresh=False, **kwargs):
+    """
+    Run ``func(case, **kwargs)`` for each case using a pool of processes.
+
+    Cases are independent, failure of one case is recorded and does not abort
+    the rest of the batch. ``func`` has to be importable (defined in a module,
+    not in a notebook) to be sent to worker processes.
+
+    Parameters
+    ----------
+    func : callable
+        function processing a single :class:`Case`
+    cases : list
+        list of :class:`Case` (e.g. result of :func:`list_cases`)
+    workers : int (default None)
+        number of worker processes. None uses all available cores, 1 runs
+        cases sequentially within the current process.
+    callback : callable (default None)
+        function called as ``callback(case, result)`` in the current process
+        once a case is done (e.g. to save results to file). Its return value
+        is stored instead of the result of ``func``.
+    fresh : bool (default False)
+        run each case in a new worker process, so that peak memory of a case
+        (see :class:`~seashore.instrument.Profiler`) does not depend on cases
+        processed before it by the same worker. Ignored if ``workers=1``.
+    **kwargs
+        keyword arguments passed to ``func``
+
+    Returns
+    -------
+    results : dict
+        results of ``func`` (or ``callback``) keyed by :class:`Case`, ordered
+        as ``cases``
+    errors : dict
+        formatted tracebacks of failed cases keyed by :class:`Case`
+
+    Examples
+    --------
+    >>> results, errors = run_cases(measure_case, list_cases('data/'), workers=8)
+    """
+    results = {}
+    errors = {}
+
+    def _done(case, result):
+        if callback is not None:
+            result = callback(case, result)
+        results[case] = result
+        print(case.part, case.name, "done")
+
+    def _failed(case, error=None):
+        errors[case] = error if error is not None else traceback.format_exc()
+        print(case.part, case.name, "failed")
+
+    if workers == 1:
+        for case in cases:
+            try:
+                _done(case, func(case, **kwargs))
+            except Exception:
+                _failed(case)
+    elif fresh:
+        tasks = [(func, case, kwargs) for case in cases]
+        with multiprocessing.Pool(workers, maxtasksperchild=1) as pool:
+            for case, result, error in pool.imap_unordered(_call, tasks):
+                if error is not None:
+                    _failed(case, error)
+                    continue
+                try:
+                    _done(case, result)
+                except Exception:
+                    _failed(case)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(func, case, **kwargs): case for case in cases}
+            for future in as_completed(futures):
+                case = futures[future]
+                try:
+                    _done(case, future.result())
+                except Exception:
+                    _failed(case)
+
+    results = {case: results[case] for case in cases if case in results}
+    return results, errors
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# sealevel.py
+# flood risk of cases under a range of sea level scenarios
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .gpkg import read_columns
+
+__all__ = ["LEVELS", "below", "sweep_case"]
+
+# sea levels (m) from 0.5 to 10 m by 0.1 m
+LEVELS = np.round(np.arange(0.5, 10.05, 0.1), 1)
+
+
+def below(values, levels, weights=None):
+    """
+    Share of (weighted) values lower than each of levels.
+
+    Values are sorted once, shares for all levels are then read from the
+    cumulative sum of weights. Missing values count only in the total.
+
+    Parameters
+    ----------
+    values : array_like
+        values (e.g. minimal elevation of buildings)
+    levels : array_like
+        thresholds
+    weights : array_like (default None)
+        weights of values (e.g. area of buildings), None counts values
+
+    Returns
+    -------
+    ndarray
+        share for each level (NaN if total weight is 0)
+
+    Examples
+    --------
+    >>> area = below(blg['min'], LEVELS, blg['sdbAre'])
+    """
+    values = np.asarray(values, dtype=float)
+    levels = np.asarray(levels, dtype=float)
+    if weights is None:
+        weights = np.ones(len(values))
+    weights = np.asarray(weights, dtype=float)
+    total = weights.sum()
+    if total == 0:
+        return np.full(len(levels), np.nan)
+
+    valid = ~np.isnan(values)
+    order = np.argsort(values[valid], kind="mergesort")
+    cumulative = np.concatenate([[0], np.cumsum(weights[valid][order])])
+    return cumulative[np.searchsorted(values[valid][order], levels, side="left")] / total
+
+
+def sweep_case(case, levels=LEVELS, column="min"):
+    """
+    Flooded share of a case for each sea level.
+
+    A building is flooded if ``column`` is lower than the sea level: its
+    minimal elevation (``min`` measured by stage 05) in the bathtub model or
+    the sea level at which it gets flooded from the sea (``min_conn``, see
+    :func:`~seashore.inundation.inundation_case`) in the connected model.
+    Values are compared as stored, as ``flooded_perc`` of
+    ``waterrelation_data.csv`` is (see
+    :func:`~seashore.waterrelation.waterrelation_case`): -999 (missing
+    elevation) counts as flooded, NaN (no pixel within the footprint, or never
+    flooded) does not. Shares are computed for each ``part`` of a case (if
+    present) from attributes read once, without geometry.
+
+    Parameters
+    ----------
+    case : Case
+        case to be measured
+    levels : array_like (default LEVELS)
+        sea levels
+    column : str (default 'min')
+        column of buildings compared to sea levels ('min' or 'min_conn')
+
+    Returns
+    -------
+    DataFrame
+        DataFrame with a row per ``part`` and level containing
+        ``case``, ``level`` and shares of flooded ``buildings``, footprint
+        ``area`` and buildings in the first row (``main``)
+
+    Examples
+    --------
+    >>> sweep = pd.concat([sweep_case(case) for case in list_cases(folder)])
+    """
+    blg = read_columns(case.path, case.name + "_blg", ["uID", "part", column, "sdbAre"])
+    tess = read_columns(case.path, case.name + "_tess", ["uID", "main"])
+    if "main" not in tess.columns:
+        warnings.warn("{}: tessellation has no column 'main'.".format(case.name))
+        tess["main"] = np.nan
+    blg = blg.merge(tess.drop_duplicates("uID"), on="uID", how="left")
+
+    if "part" in blg.columns:
+        groups = [(case.name + str(part), subset) for part, subset in blg.groupby("part")]
+    else:
+        groups = [(case.name, blg)]
+
+    frames = []
+    for name, subset in groups:
+        main = subset[subset["main"] == 1]
+        frames.append(
+            pd.DataFrame(
+                {
+                    "case": name,
+                    "level": levels,
+                    "buildings": below(subset[column], levels),
+                    "area": below(subset[column], levels, subset["sdbAre"]),
+                    "main": below(main[column], levels),
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# stability.py
+# bootstrap stability of hierarchical clustering of cases
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.cluster import hierarchy
+
+__all__ = ["bootstrap_stability"]
+
+# data of cases, sent to each worker process once
+_DATA = None
+
+
+def _init(values):
+    global _DATA
+    _DATA = values
+
+
+def _replicates(seeds, n_clusters, method, resample, features):
+    """Count co-assignment of cases within replicates of ``seeds``."""
+    n, m = _DATA.shape
+    together = np.zeros((n, n))
+    present = np.zeros((n, n))
+    for seed in seeds:
+        rng = np.random.RandomState(seed)
+        rows = rng.choice(n, n, replace=True) if resample else np.arange(n)
+        cols = np.sort(rng.choice(m, max(int(round(features * m)), 1), replace=False))
+        X = _DATA[np.ix_(rows, cols)]
+        labels = hierarchy.fcluster(hierarchy.linkage(X, method), n_clusters, criterion='maxclust')
+
+        # duplicated cases are identical, so they share a cluster
+        unique, first = np.unique(rows, return_index=True)
+        labels = labels[first]
+        present[np.ix_(unique, unique)] += 1
+        together[np.ix_(unique, unique)] += labels[:, None] == labels[None, :]
+    return together, present
+
+
+def bootstrap_stability(
+    data,
+    labels,
+    n_boot=1000,
+    method='ward',
+    resample=True,
+    features=0.8,
+    workers=None,
+    batch=50,
+    seed=0,
+):
+    """
+    Stability of clusters of cases under resampling of cases and characters.
+
+    Each replicate clusters a bootstrap sample of cases (drawn with
+    replacement) described by a random subset of characters into the same
+    number of clusters as ``labels``. Co-assignment of a pair of cases is the
+    share of replicates containing both in which they share a cluster.
+    Stability of a case is the mean agreement of its co-assignments with
+    ``labels`` (1 if it always shares a cluster with the same cases).
+
+    Replicates are run in batches of ``batch`` within a pool of processes,
+    data are sent to each process once and each batch returns only summed
+    co-assignment counts.
+
+    Parameters
+    ----------
+    data : DataFrame
+        standardized characters of cases (e.g. ``summative_data_norm.csv``)
+    labels : array_like
+        clusters of cases to be assessed, ordered as ``data``
+    n_boot : int (default 1000)
+        number of replicates
+    method : str (default 'ward')
+        linkage method
+    resample : bool (default True)
+        resample cases with replacement. False uses all cases in each replicate.
+    features : float (default 0.8)
+        share of characters drawn (without replacement) for each replicate
+    workers : int (default None)
+        number of worker processes, None uses all cores, 1 runs in the
+        current process
+    batch : int (default 50)
+        number of replicates processed by a worker at once
+    seed : int (default 0)
+        seed of the first replicate, replicates use consecutive seeds
+
+    Returns
+    -------
+    coassignment : DataFrame
+        co-assignment matrix of cases
+    stability : Series
+        stability of cases
+
+    Examples
+    --------
+    >>> coassignment, stability = bootstrap_stability(data, gdf.cl, n_boot=1000)
+    """
+    values = np.ascontiguousarray(data.values, dtype=np.float64)
+    labels = np.asarray(labels)
+    n_clusters = len(np.unique(labels))
+    seeds = np.arange(seed, seed + n_boot)
+    batches = [seeds[i:i + batch] for i in range(0, n_boot, batch)]
+    args = (n_clusters, method, resample, features)
+
+    if workers == 1:
+        _init(values)
+        results = [_replicates(b, *args) for b in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init,
+                                 initargs=(values,)) as executor:
+            futures = [executor.submit(_replicates, b, *args) for b in batches]
+            results = [future.result() for future in futures]
+
+    together = sum(r[0] for r in results)
+    present = sum(r[1] for r in results)
+    with np.errstate(invalid='ignore'):
+        coassignment = together / present
+
+    same = labels[:, None] == labels[None, :]
+    agreement = np.where(same, coassignment, 1 - coassignment)
+    np.fill_diagonal(agreement, np.nan)
+    stability = np.nanmean(agreement, axis=1)
+
+    return (pd.DataFrame(coassignment, index=data.index, columns=data.index),
+            pd.Series(stability, index=data.index, name='stability'))
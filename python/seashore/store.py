@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# store.py
+# columnar (GeoParquet) store of case layers shared by stages
+
+import json
+import os
+
+import geopandas as gpd
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from shapely import wkb
+
+__all__ = ["MANUAL", "store_path", "write_store", "read_store"]
+
+# attributes assigned manually in GeoPackages after stage 02 (part of buildings,
+# seashore street of edges), always read from GeoPackages
+MANUAL = ["part", "case"]
+
+
+def store_path(case, suffix):
+    """
+    Path to stored layer of a case.
+
+    Layers are stored next to the GeoPackage of a case, e.g. layer
+    ``aguda_blg`` of ``data/atlantic.gpkg`` as
+    ``data/store/atlantic/aguda_blg.parquet``.
+    """
+    return os.path.join(
+        os.path.dirname(case.path), "store", case.part, case.name + "_" + suffix + ".parquet"
+    )
+
+
+def _geo_metadata(gdf):
+    crs = gdf.crs.to_wkt() if gdf.crs is not None else None
+    return {
+        "version": "0.1.0",
+        "primary_column": "geometry",
+        "columns": {
+            "geometry": {
+                "encoding": "WKB",
+                "crs": crs,
+                "geometry_types": sorted(set(gdf.geom_type.dropna())),
+                "bbox": list(gdf.total_bounds),
+            }
+        },
+    }
+
+
+def write_store(case, layers):
+    """
+    Write layers of a case into the columnar store as GeoParquet files.
+
+    Geometry is stored as WKB in a separate column, so attributes can be read
+    without parsing geometries. Manually assigned attributes (:data:`MANUAL`)
+    are not stored, as they may be edited in GeoPackages afterwards.
+
+    Parameters
+    ----------
+    case : Case
+        case of layers
+    layers : dict
+        GeoDataFrames keyed by layer suffix (e.g. 'blg')
+
+    Examples
+    --------
+    >>> write_store(case, {'blg': buildings, 'tess': tessellation})
+    """
+    for suffix, gdf in layers.items():
+        path = store_path(case, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        manual = [c for c in MANUAL if c in gdf.columns]
+        df = pd.DataFrame(gdf.drop(columns=[gdf.geometry.name] + manual))
+        df["geometry"] = [None if geom is None else geom.wkb for geom in gdf.geometry]
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b"geo"] = json.dumps(_geo_metadata(gdf)).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        # write next to the target and replace it, so readers never see half a file
+        tmp = path + ".tmp"
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+
+
+def read_store(case, suffix, columns=None, geometry=False):
+    """
+    Read a layer of a case, only the requested columns.
+
+    Layer is read from the columnar store (memory-mapped, only requested
+    columns are decoded). If it is not stored, it is read from the GeoPackage
+    of a case.
+
+    Parameters
+    ----------
+    case : Case
+        case of the layer
+    suffix : str
+        suffix of the layer (e.g. 'blg')
+    columns : list (default None)
+        attribute columns to be read, None reads all. Columns missing in
+        the layer are skipped.
+    geometry : bool (default False)
+        read geometry and return GeoDataFrame
+
+    Returns
+    -------
+    DataFrame or GeoDataFrame
+
+    Examples
+    --------
+    >>> edges = read_store(case, 'str', columns=['nID', 'sdsLen'])
+    """
+    path = store_path(case, suffix)
+    if os.path.exists(path):
+        names = pq.read_schema(path).names
+        if columns is None:
+            columns = [c for c in names if c != "geometry"]
+        columns = [c for c in columns if c in names]
+        read = columns + ["geometry"] if geometry else columns
+        table = pq.read_table(path, columns=read, memory_map=True)
+        df = table.to_pandas()
+        if not geometry:
+            return df
+        metadata = json.loads(table.schema.metadata[b"geo"])
+        geoms = [None if g is None else wkb.loads(g) for g in df.pop("geometry")]
+        return gpd.GeoDataFrame(df, geometry=geoms, crs=metadata["columns"]["geometry"]["crs"])
+
+    gdf = gpd.read_file(case.path, layer=case.name + "_" + suffix)
+    if columns is not None:
+        columns = [c for c in columns if c in gdf.columns]
+        gdf = gdf[columns + ["geometry"]]
+    return gdf if geometry else pd.DataFrame(gdf.drop(columns="geometry"))
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# summary.py
+# lightweight summary of geometry of cases computed from coordinate arrays
+
+import hashlib
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from shapely import wkb
+from shapely.geometry import MultiPoint, Polygon
+
+from .cache import layer_fingerprint
+from .gpkg import read_columns
+from .geometry import convex_hull, flatten
+from .store import store_path
+
+__all__ = ["geometry_summary", "case_summary"]
+
+COLUMNS = ['x', 'y', 'area', 'count', 'minx', 'miny', 'maxx', 'maxy']
+
+
+def geometry_summary(geoms):
+    """
+    Summary of a set of polygons computed from their coordinates.
+
+    Centroid is the area-weighted centroid of all polygons, which equals the
+    centroid of their union if they do not overlap. Convex hull of all
+    vertices equals the convex hull of their union. No overlay is done.
+
+    Parameters
+    ----------
+    geoms : GeoSeries
+        (Multi)Polygons
+
+    Returns
+    -------
+    dict
+        centroid (``x``, ``y``), total ``area``, ``count`` of polygons,
+        bounds (``minx``, ``miny``, ``maxx``, ``maxy``) and convex ``hull``
+
+    Examples
+    --------
+    >>> summary = geometry_summary(blg.geometry)
+    >>> location = Point(summary['x'], summary['y'])
+    """
+    geoms = [g for g in geoms if g is not None and not g.is_empty]
+    coords, ring_offsets, _, exterior, _ = flatten(geoms)
+    if not len(coords):
+        return dict(dict.fromkeys(COLUMNS, np.nan), count=0, hull=None)
+
+    # shifted to the first vertex to keep precision of projected coordinates
+    origin = coords[0]
+    x, y = (coords - origin).T
+    cross = x[:-1] * y[1:] - x[1:] * y[:-1]
+    # segments joining the last vertex of a ring with the first of the next
+    cross[ring_offsets[1:-1] - 1] = 0
+    starts = ring_offsets[:-1]
+    area = np.add.reduceat(cross, starts) / 2
+    mx = np.add.reduceat((x[:-1] + x[1:]) * cross, starts) / 6
+    my = np.add.reduceat((y[:-1] + y[1:]) * cross, starts) / 6
+    # exterior rings add area, holes remove it, regardless of orientation
+    sign = np.where(exterior, 1.0, -1.0) * np.sign(area)
+    total = (sign * area).sum()
+
+    hull = convex_hull(coords)
+    minx, miny = coords.min(axis=0)
+    maxx, maxy = coords.max(axis=0)
+    return {
+        'x': (sign * mx).sum() / total + origin[0],
+        'y': (sign * my).sum() / total + origin[1],
+        'area': total,
+        'count': len(geoms),
+        'minx': minx,
+        'miny': miny,
+        'maxx': maxx,
+        'maxy': maxy,
+        'hull': Polygon(hull) if len(hull) > 2 else MultiPoint(hull).convex_hull,
+    }
+
+
+def _fingerprint(case, layer):
+    sha = hashlib.sha1(layer_fingerprint(case.path, layer, subset='geometry').encode())
+    parts = read_columns(case.path, layer, ['part'])
+    if 'part' in parts.columns:
+        sha.update(repr(parts['part'].tolist()).encode())
+    return sha.hexdigest()
+
+
+def _summarise(case, layer):
+    blg = gpd.read_file(case.path, layer=layer)
+
+    rows = [dict(geometry_summary(blg.geometry), name=case.name, part=np.nan)]
+    if 'part' in blg.columns:
+        for part in set(blg.part):
+            subset = blg.loc[blg.part == part]
+            rows.append(dict(geometry_summary(subset.geometry), name=case.name + str(part),
+                             part=part))
+    return pd.DataFrame(rows, columns=['name', 'part'] + COLUMNS + ['hull'])
+
+
+def case_summary(case, by_part=True):
+    """
+    Summary of geometry of buildings of a case, cached.
+
+    Summary (see :func:`geometry_summary`) of the whole case and of each
+    ``part`` of buildings is stored as ``data/store/part/name_summary.parquet``
+    together with the fingerprint of geometries and parts of buildings, and
+    computed again only once they change.
+
+    Parameters
+    ----------
+    case : Case
+        case to be summarised
+    by_part : bool (default True)
+        summarise each ``part`` of buildings (if present) instead of the
+        whole case
+
+    Returns
+    -------
+    DataFrame
+        summary indexed by case (and part, as ``name + str(part)``), with
+        ``part`` of buildings and convex ``hull`` as shapely geometry
+
+    Examples
+    --------
+    >>> summary = case_summary(case)
+    >>> points = gpd.points_from_xy(summary.x, summary.y)
+    """
+    layer = case.name + '_blg'
+    path = store_path(case, 'summary')
+    fingerprint = _fingerprint(case, layer)
+
+    summary = None
+    if os.path.exists(path):
+        table = pq.read_table(path)
+        if table.schema.metadata.get(b'fingerprint', b'').decode() == fingerprint:
+            summary = table.to_pandas()
+            summary['hull'] = [None if h is None else wkb.loads(h) for h in summary['hull']]
+    if summary is None:
+        summary = _summarise(case, layer)
+        stored = summary.assign(
+            hull=[None if h is None else h.wkb for h in summary['hull']],
+            part=summary['part'].astype(float),
+        )
+        table = pa.Table.from_pandas(stored, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b'fingerprint'] = fingerprint.encode()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        pq.write_table(table.replace_schema_metadata(metadata), tmp)
+        os.replace(tmp, path)
+
+    if by_part and len(summary) > 1:
+        summary = summary.iloc[1:]
+    else:
+        summary = summary.iloc[:1]
+    return summary.set_index('name')
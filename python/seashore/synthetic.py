@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# synthetic.py
+# synthetic seashore cases of scalable size
+
+import os
+
+import geopandas as gpd
+import numpy as np
+import rasterio as rio
+from rasterio.transform import from_origin
+from shapely.geometry import LineString, box
+
+from .gpkg import add_columns
+from .runner import Case
+
+__all__ = ["synthetic_case", "mark_seashore"]
+
+CRS = "EPSG:3763"
+# size of a block between streets and of a building plot within a block
+BLOCK = 100
+PLOT = 20
+# buildings per part (summarised separately by contextual characters)
+PART = 1000
+
+
+def _streets(length, depth):
+    """Grid of streets split at junctions, the first row runs along the shore."""
+    lines = []
+    case = []
+    for j in range(depth + 1):
+        for i in range(length):
+            y = j * BLOCK
+            lines.append(LineString([(i * BLOCK, y), ((i + 1) * BLOCK, y)]))
+            case.append(1 if j == 0 else 0)
+    for i in range(length + 1):
+        for j in range(depth):
+            x = i * BLOCK
+            lines.append(LineString([(x, j * BLOCK), (x, (j + 1) * BLOCK)]))
+            case.append(0)
+    return lines, case
+
+
+def _buildings(n, length, rng):
+    """Rectangles in plots of blocks, filled from the shore inland."""
+    per_block = (BLOCK // PLOT - 1) ** 2
+    plot = np.arange(n)
+    block, within = plot // per_block, plot % per_block
+    side = BLOCK // PLOT - 1
+    bx = (block % length) * BLOCK + PLOT / 2 + (within % side) * PLOT
+    by = (block // length) * BLOCK + PLOT / 2 + (within // side) * PLOT
+    width, height = rng.uniform(6, PLOT - 2, (2, n))
+    x = bx + rng.uniform(0, PLOT - width)
+    y = by + rng.uniform(0, PLOT - height)
+    return [box(*b) for b in zip(x, y, x + width, y + height)]
+
+
+def _dtm(folder, extent, tile, resolution, rng, slope=0.02):
+    """DTM tiles (ESRI ASCII) rising inland from the shore and their grid."""
+    minx, miny, maxx, maxy = extent
+    os.makedirs(folder, exist_ok=True)
+    ids, tiles = [], []
+    for tx in np.arange(minx, maxx, tile):
+        for ty in np.arange(miny, maxy, tile):
+            rpart = "{:.0f}_{:.0f}".format(tx, ty)
+            size = int(tile / resolution)
+            rows = ty + tile - (np.arange(size) + 0.5) * resolution
+            elevation = np.repeat((rows * slope)[:, None], size, axis=1)
+            elevation += rng.normal(0, 0.5, elevation.shape)
+            profile = dict(driver="AAIGrid", width=size, height=size, count=1,
+                           dtype="float32", nodata=-999, crs=CRS,
+                           transform=from_origin(tx, ty + tile, resolution, resolution))
+            path = os.path.join(folder, rpart + "-top_orto.asc")
+            with rio.open(path, "w", **profile) as dst:
+                dst.write(elevation.astype("float32"), 1)
+            ids.append(rpart)
+            tiles.append(box(tx, ty, tx + tile, ty + tile))
+    return gpd.GeoDataFrame({"Id_Unidade": ids}, geometry=tiles, crs=CRS)
+
+
+def synthetic_case(folder, n, name=None, seed=0, dtm_resolution=5, dtm_tile=2000):
+    """
+    Generate a synthetic seashore case of ``n`` buildings.
+
+    Case is a strip of square blocks along a straight shore (``y = 0``) about
+    eight times longer than deep. The first row of streets runs along the
+    shore (``case == 1``). Blocks are filled with rectangular buildings from
+    the shore inland and buildings are grouped into parts of 1000 buildings.
+    DTM rises inland with a slope of 2 % and random noise.
+
+    Layers ``name_blg``, ``name_str`` and ``name_case`` are written to
+    ``folder/synthetic.gpkg`` and DTM tiles to ``folder/MDT/``, following
+    the structure of real data.
+
+    Parameters
+    ----------
+    folder : str
+        folder to write data to
+    n : int
+        number of buildings
+    name : str (default None)
+        name of the case, None uses ``'synth' + str(n)``
+    seed : int (default 0)
+        seed of random generator (same seed gives the same case)
+    dtm_resolution : float (default 5)
+        resolution of DTM in metres
+    dtm_tile : float (default 2000)
+        size of DTM tiles in metres
+
+    Returns
+    -------
+    case : Case
+        generated case
+    grid : GeoDataFrame
+        grid of DTM tiles with ``Id_Unidade``
+
+    Examples
+    --------
+    >>> case, grid = synthetic_case('bench/', 10000)
+    >>> layers = measure_case(case)
+    """
+    rng = np.random.default_rng(seed)
+    name = name or "synth" + str(n)
+    path = os.path.join(folder, "synthetic.gpkg")
+    os.makedirs(folder, exist_ok=True)
+
+    blocks = int(np.ceil(n / (BLOCK // PLOT - 1) ** 2))
+    depth = max(1, int(np.ceil(np.sqrt(blocks / 8))))
+    length = int(np.ceil(blocks / depth))
+
+    geometry = _buildings(n, length, rng)
+    buildings = gpd.GeoDataFrame(
+        {"Buildings": 1, "id": np.arange(n), "part": np.arange(n) // PART},
+        geometry=geometry,
+        crs=CRS,
+    )
+    lines, case = _streets(length, depth)
+    streets = gpd.GeoDataFrame({"case": case}, geometry=lines, crs=CRS)
+    extent = (0, 0, length * BLOCK, depth * BLOCK)
+    limit = gpd.GeoDataFrame(geometry=[box(*extent)], crs=CRS)
+
+    buildings.to_file(path, layer=name + "_blg", driver="GPKG")
+    streets.to_file(path, layer=name + "_str", driver="GPKG")
+    limit.to_file(path, layer=name + "_case", driver="GPKG")
+
+    grid = _dtm(os.path.join(folder, "MDT"), extent, dtm_tile, dtm_resolution, rng)
+    return Case("synthetic", path, name), grid
+
+
+def mark_seashore(case):
+    """
+    Assign ``case`` to edges of a measured synthetic case.
+
+    ``case`` of seashore streets is assigned manually to the ``name_str``
+    layer saved by :func:`~seashore.measure.measure_case`, as edges are merged
+    and identified anew. Edges running along the shore (``y = 0``) are set to
+    1, others to 0.
+
+    Examples
+    --------
+    >>> layers = measure_case(case)
+    >>> write_layers(case.path, {case.name + '_' + s: gdf for s, gdf in layers.items()})
+    >>> mark_seashore(case)
+    """
+    edges = gpd.read_file(case.path, layer=case.name + "_str")
+    shore = (edges.bounds.maxy.abs() < 1e-6).astype(int)
+    add_columns(case.path, case.name + "_str", edges[["nID"]].assign(case=shore.values), key="nID")
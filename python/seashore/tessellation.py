@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# tessellation.py
+# tiled morphological tessellation of large cases
+
+from concurrent.futures import ProcessPoolExecutor
+
+import geopandas as gpd
+import momepy as mm
+import numpy as np
+import pandas as pd
+from shapely.geometry import box
+
+__all__ = ["tiled_tessellation"]
+
+# distance of hull points added by momepy.Tessellation from convex hull of limit
+HULL = 300
+
+
+def _cut(cell, limit):
+    """Cut cell by limit the way momepy.Tessellation does (keeps the largest part)."""
+    intersection = cell.intersection(limit)
+    if intersection.geom_type == "MultiPolygon":
+        return max(intersection.geoms, key=lambda part: part.area)
+    if intersection.geom_type == "GeometryCollection":
+        polygons = [geom for geom in intersection.geoms if geom.geom_type == "Polygon"]
+        return polygons[-1] if polygons else cell
+    return intersection
+
+
+def _tessellate_tile(
+    buildings, unique_id, limit, core, expanded, sealed, complete, kwargs
+):
+    """
+    Tessellate buildings of a single tile.
+
+    Returns cells of buildings assigned to the tile core and IDs of cells which
+    may differ from the monolithic tessellation.
+
+    Unless the tile is ``complete`` (covers whole study area), the tile is
+    tessellated within the ``expanded`` tile and cells are cut by ``limit``
+    afterwards. Any point of an uncut cell is closer to its building than
+    the diagonal of cell's bounding box (building lies within its cell). If the
+    bounding box expanded by its diagonal lies within the expanded tile, no
+    building outside of the tile can affect the cell. Hull points bounding the
+    monolithic diagram can't affect it either if they all lie outside of the
+    expanded tile (``sealed``) or if the diagonal is shorter than
+    :data:`HULL`. Other cells are reported as unstable.
+    """
+    if complete:
+        tess = mm.Tessellation(buildings, unique_id, limit=limit, **kwargs)
+        cells = tess.tessellation
+        return cells[cells[unique_id].isin(core)], []
+
+    tess = mm.Tessellation(buildings, unique_id, limit=expanded, **kwargs)
+    cells = tess.tessellation
+    cells = cells[cells[unique_id].isin(core)]
+
+    bounds = cells.bounds
+    diagonal = np.hypot(bounds.maxx - bounds.minx, bounds.maxy - bounds.miny)
+    minx, miny, maxx, maxy = expanded.bounds
+    stable = (
+        (bounds.minx - diagonal >= minx)
+        & (bounds.miny - diagonal >= miny)
+        & (bounds.maxx + diagonal <= maxx)
+        & (bounds.maxy + diagonal <= maxy)
+        & (sealed or (diagonal < HULL))
+    )
+    cells = cells.copy()
+    cells['geometry'] = [_cut(cell, limit) for cell in cells.geometry]
+    return cells, list(cells.loc[~stable, unique_id])
+
+
+def tiled_tessellation(
+    buildings, unique_id, limit, tile_size=1000, buffer=250, workers=1, **kwargs
+):
+    """
+    Generate morphological tessellation tile by tile.
+
+    Extent of ``limit`` is split into square tiles. Each building is assigned
+    to a single tile (core) based on its representative point and tessellated
+    together with buildings within ``buffer`` around the tile, so the
+    Voronoi diagram of the core is not affected by the tile edge. Cells of
+    tile cores are then stitched together on ``unique_id``.
+
+    Cells which could be affected by the edge of the expanded tile are
+    re-tessellated with doubled buffer until none of them is (eventually the
+    expanded tile covers whole ``limit``), so the result matches the
+    monolithic :class:`momepy.Tessellation`. Peak memory depends on the size of a tile
+    (and the number of ``workers``), not on the size of the case.
+
+    Parameters
+    ----------
+    buildings : GeoDataFrame
+        GeoDataFrame containing building footprints
+    unique_id : str
+        name of the column with unique id
+    limit : MultiPolygon or Polygon
+        MultiPolygon or Polygon defining the study area
+    tile_size : float (default 1000)
+        length of the side of a tile core
+    buffer : float (default 250)
+        initial overlap of tiles
+    workers : int (default 1)
+        number of worker processes tessellating tiles
+    **kwargs
+        keyword arguments passed to :class:`momepy.Tessellation`
+        (e.g. ``shrink``, ``segment``)
+
+    Returns
+    -------
+    GeoDataFrame
+        morphological tessellation
+
+    Examples
+    --------
+    >>> tessellation = tiled_tessellation(buildings, 'uID', limit, tile_size=500, workers=8)
+    """
+    minx, miny, maxx, maxy = limit.bounds
+    points = buildings.geometry.representative_point()
+    col = np.floor((points.x.values - minx) / tile_size).astype(int)
+    row = np.floor((points.y.values - miny) / tile_size).astype(int)
+    cores = pd.Series(buildings[unique_id].values).groupby([col, row])
+    sindex = buildings.sindex
+    hull = limit.convex_hull.buffer(HULL)
+
+    pending = [
+        (box(minx + c * tile_size, miny + r * tile_size,
+             minx + (c + 1) * tile_size, miny + (r + 1) * tile_size), list(ids))
+        for (c, r), ids in cores
+    ]
+    results = []
+    while pending:
+        tasks = []
+        for core_box, core in pending:
+            expanded = box(*core_box.buffer(buffer, join_style=2).bounds)
+            subset = buildings.iloc[sorted(sindex.intersection(expanded.bounds))]
+            subset = subset[subset.intersects(expanded) | subset[unique_id].isin(core)]
+            if expanded.contains(limit):
+                tile_limit, complete = limit, True
+            else:
+                tile_limit, complete = limit.intersection(expanded), False
+            sealed = hull.contains(expanded)
+            tasks.append(
+                (subset, unique_id, tile_limit, core, expanded, sealed, complete, kwargs)
+            )
+
+        if workers == 1:
+            done = [_tessellate_tile(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                done = list(executor.map(_tessellate_tile, *zip(*tasks)))
+
+        retry = []
+        for (core_box, core), (cells, unstable) in zip(pending, done):
+            unstable = set(unstable)
+            results.append(cells[~cells[unique_id].isin(unstable)])
+            if unstable:
+                retry.append((core_box, [i for i in core if i in unstable]))
+        pending = retry
+        buffer *= 2
+
+    tessellation = pd.concat(results, ignore_index=True)
+    tessellation = gpd.GeoDataFrame(tessellation, geometry="geometry", crs=buildings.crs)
+    return tessellation.sort_values(unique_id).reset_index(drop=True)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# waterrelation.py
+# flood risk of cases aggregated in a single pass over buildings
+
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .gpkg import read_columns
+
+__all__ = ["waterrelation_case", "write_waterrelation"]
+
+COLUMNS = ['min_min', 'min_med', 'flooded_perc']
+
+
+def waterrelation_case(case, level=5):
+    """
+    Flood risk of a case and diagnostics of its buildings.
+
+    Attributes of buildings (``part``, ``min``) and ``main`` of tessellation
+    cells are read once, without geometry. Flood risk is aggregated per
+    ``part`` of a case (if present): minimal and median ``min`` of buildings
+    in the first row (``main`` equal to 1) and share of flooded buildings
+    (``min`` lower than ``level``).
+
+    Parameters
+    ----------
+    case : Case
+        case to be aggregated
+    level : float (default 5)
+        sea level (m)
+
+    Returns
+    -------
+    rows : DataFrame
+        rows of ``waterrelation_data.csv`` indexed by case (and part)
+    diagnostics : dict
+        number of buildings (``buildings``), of buildings without elevation
+        (``missing``) and of flooded buildings (``flooded``)
+
+    Examples
+    --------
+    >>> rows, diagnostics = waterrelation_case(case)
+    """
+    buildings = read_columns(case.path, case.name + '_blg', ['uID', 'part', 'min'])
+    tessellation = read_columns(case.path, case.name + '_tess', ['uID', 'main'])
+    buildings['min'] = buildings['min'].astype(float)
+
+    elevation = buildings['min'].replace(-999, np.nan)
+    diagnostics = {
+        'buildings': len(buildings),
+        'missing': int(elevation.isna().sum()),
+        'flooded': int((elevation < level).sum()),
+    }
+
+    if 'main' not in tessellation.columns:
+        warnings.warn(case.name)
+        tessellation['main'] = np.nan
+    buildings = buildings.merge(tessellation[['uID', 'main']], on='uID', how='left')
+    main = buildings[buildings['main'] == 1]
+
+    index, values = [], []
+    if 'part' in main.columns:
+        for part in set(main.part):
+            subset = main.loc[main.part == part]
+            mainset = buildings.loc[buildings.part == part]
+            index.append(case.name + str(part))
+            values.append([
+                subset['min'].min(),
+                subset['min'].median(),
+                (mainset['min'] < level).sum() / len(mainset),
+            ])
+    else:
+        index.append(case.name)
+        values.append([
+            main['min'].min(),
+            main['min'].median(),
+            (buildings['min'] < level).sum() / len(buildings),
+        ])
+    rows = pd.DataFrame(values, index=index, columns=COLUMNS, dtype=float)
+    return rows, diagnostics
+
+
+def write_waterrelation(cases, path, level=5):
+    """
+    Aggregate flood risk of cases and write it to CSV case by case.
+
+    Rows of each case are appended to ``path`` once the case is aggregated
+    (see :func:`waterrelation_case`), diagnostics are printed.
+
+    Parameters
+    ----------
+    cases : list
+        list of :class:`~seashore.runner.Case`
+    path : str
+        path to CSV, overwritten
+    level : float (default 5)
+        sea level (m)
+
+    Examples
+    --------
+    >>> write_waterrelation(list_cases(folder), 'data/waterrelation_data.csv')
+    """
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        pd.DataFrame(columns=COLUMNS).to_csv(f)
+        for case in cases:
+            rows, diagnostics = waterrelation_case(case, level)
+            print(case.part, case.name, '- NaN in min:', diagnostics['missing'], '/',
+                  diagnostics['buildings'], '- below', level, 'm:', diagnostics['flooded'],
+                  diagnostics['flooded'] / diagnostics['buildings'])
+            rows.to_csv(f, header=False)
+    os.replace(tmp, path)
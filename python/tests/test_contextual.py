@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# test_contextual.py
+# summarise of small groups by hand and compared to the original loop over groups
+
+import momepy as mm
+import numpy as np
+import pandas as pd
+import pytest
+import scipy as sp
+import scipy.stats
+from inequality.theil import Theil
+
+from seashore.contextual import summarise
+
+
+def _theil(values):
+    share = values / values.sum()
+    return (share * np.log(len(values) * share)).sum()
+
+
+@pytest.mark.filterwarnings("ignore")
+def test_known_groups():
+    data = pd.DataFrame({"x": [1, 2, 3, 4, 5, 2, 4, 1, 2, np.nan, 4, 5, 3]})
+    by = ["a"] * 5 + ["b"] * 2 + ["c"] * 5 + ["d"]
+    result = summarise(data, by, ["x"])
+    assert list(result.index) == ["a", "b", "c", "d"]
+    expected = np.array(
+        [
+            # IQ keeps 2, 3, 4 (nearest percentiles), ID keeps all values
+            [3, 4 - 2, _theil(np.arange(1, 6.0))],
+            # groups of less than three values are not limited
+            [3, 3.5 - 2.5, _theil(np.array([2.0, 4.0]))],
+            # limit_range of values with NaN is empty
+            [np.nan, np.nan, 0],
+            [3, 0, 0],
+        ]
+    )
+    np.testing.assert_allclose(result.values, expected, rtol=1e-12)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    sizes = {"a": 1, "b": 2, "c": 3, "d": 10, "e": 57, "f": 200}
+    by = np.concatenate([[group] * size for group, size in sizes.items()])
+    n = len(by)
+    data = pd.DataFrame(
+        {
+            "continuous": rng.lognormal(3, 1, n),
+            # ties and zeros
+            "discrete": rng.integers(0, 6, n).astype(float),
+            "nan": rng.uniform(0, 1, n),
+        }
+    )
+    # NaN within a small and a large group
+    data.loc[[1, 100], "nan"] = np.nan
+    # rows of groups are not contiguous
+    order = rng.permutation(n)
+    return data.iloc[order].reset_index(drop=True), by[order]
+
+
+def _original(data, by, columns):
+    # notebook 03 before vectorization
+    summative = pd.DataFrame()
+    for group in pd.unique(by):
+        subset = data.loc[by == group]
+        for col in columns:
+            values = subset[col]
+            values_IQ = mm.limit_range(values, rng=(25, 75))
+            values_ID = mm.limit_range(values, rng=(10, 90))
+
+            summative.loc[group, col + "_meanIQ"] = np.mean(values_IQ)
+            summative.loc[group, col + "_rangeIQ"] = sp.stats.iqr(values)
+            summative.loc[group, col + "_TheilID"] = Theil(values_ID).T
+    return summative
+
+
+@pytest.mark.filterwarnings("ignore")
+def test_original(data):
+    data, by = data
+    columns = list(data.columns)
+    expected = _original(data, by, columns)
+    result = summarise(data, by, columns)
+    assert list(result.index) == list(expected.index)
+    assert list(result.columns) == list(expected.columns)
+    np.testing.assert_allclose(result.values, expected.values.astype(float), rtol=1e-9, atol=1e-12)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# test_flood.py
+# zonal_stats compared to rasterstats (v0.14) and windows of tiles to their mosaic
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import rasterio as rio
+import rasterstats
+from affine import Affine
+from rasterio.merge import merge
+from shapely.affinity import rotate
+from shapely.geometry import Point, box
+
+from seashore.flood import STATS, read_window, zonal_stats
+
+
+@pytest.fixture
+def footprints():
+    rng = np.random.default_rng(0)
+    geoms = []
+    for _ in range(40):
+        x, y = rng.uniform(2, 50, 2)
+        w, h = rng.uniform(1, 8, 2)
+        geoms.append(rotate(box(x, y, x + w, y + h), rng.uniform(0, 90)))
+    geoms += [
+        # overlapping footprints
+        box(10, 10, 20, 20),
+        box(15, 15, 25, 25),
+        box(12, 12, 18, 30),
+        # all pixels are nodata
+        box(40.2, 2.2, 43.8, 5.8),
+        # smaller than a pixel, no pixel centre inside
+        box(30.1, 30.1, 30.3, 30.3),
+        # partly outside of the raster
+        Point(0, 30).buffer(5),
+    ]
+    return gpd.GeoSeries(geoms, index=np.arange(len(geoms)) * 2 + 1)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int16"])
+def test_rasterstats(footprints, dtype):
+    rng = np.random.default_rng(1)
+    array = (rng.uniform(-5, 40, (60, 60)) * (100 if dtype == "int16" else 1)).astype(dtype)
+    # ties for median and min/max
+    array[20:30, 20:30] = array[20, 20]
+    array[rng.uniform(size=array.shape) < 0.1] = -999
+    affine = Affine(1, 0, 0, 0, -1, 60)
+    array[54:59, 40:44] = -999
+
+    result = zonal_stats(footprints, array, affine, nodata=-999)
+    expected = rasterstats.zonal_stats(
+        list(footprints), array, affine=affine, nodata=-999, stats=STATS
+    )
+    expected = pd.DataFrame(expected, columns=STATS, index=footprints.index)
+
+    assert (result["count"] > 0).sum() < len(footprints)
+    np.testing.assert_array_equal(result["count"].values, expected["count"].values)
+    for stat in ["min", "max", "median"]:
+        np.testing.assert_array_equal(result[stat].values, expected[stat].astype(float).values)
+    np.testing.assert_allclose(
+        result["mean"].values, expected["mean"].astype(float).values, rtol=1e-12
+    )
+
+
+def test_read_window(tmp_path):
+    rng = np.random.default_rng(2)
+    sources = []
+    for i, (x, y) in enumerate([(0, 1000), (1000, 1000), (0, 2000)]):
+        array = rng.uniform(0, 20, (200, 200)).astype("float32")
+        array[rng.uniform(size=array.shape) < 0.05] = -999
+        path = str(tmp_path / "{}.tif".format(i))
+        with rio.open(path, "w", driver="GTiff", width=200, height=200, count=1,
+                      dtype="float32", nodata=-999,
+                      transform=Affine(5, 0, x, 0, -5, y)) as dst:
+            dst.write(array, 1)
+        sources.append(rio.open(path))
+    try:
+        mosaic, transform = merge(sources)
+        mosaic = mosaic[0]
+        # across tiles, partly outside of them and within a single tile
+        for bounds in [(12.3, 402.1, 1587.6, 1595), (-300, 500, 1200, 2300), (40, 40, 60, 60),
+                       (102, 1312, 611, 1807)]:
+            array, affine = read_window(sources, bounds)
+            assert affine.a == 5 and affine.e == -5
+            # one pixel around bounds
+            assert affine.c <= bounds[0] - 5 and affine.f >= bounds[3] + 5
+            assert affine.c + 5 * array.shape[1] >= bounds[2] + 5
+            assert affine.f - 5 * array.shape[0] <= bounds[1] - 5
+
+            row = int(round((transform.f - affine.f) / 5))
+            col = int(round((affine.c - transform.c) / 5))
+            expected = np.full(array.shape, -999, dtype="float32")
+            r0, c0 = max(row, 0), max(col, 0)
+            r1 = min(row + array.shape[0], mosaic.shape[0])
+            c1 = min(col + array.shape[1], mosaic.shape[1])
+            expected[r0 - row:r1 - row, c0 - col:c1 - col] = mosaic[r0:r1, c0:c1]
+            np.testing.assert_array_equal(array, expected)
+    finally:
+        for src in sources:
+            src.close()
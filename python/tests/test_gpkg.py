@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# test_gpkg.py
+# layers written through GDAL read back, spatial index kept by add_columns
+
+import sqlite3
+
+import fiona
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import LineString, box
+
+from seashore.gpkg import add_columns, read_columns, write_layers
+
+CRS = "EPSG:3763"
+
+
+def _buildings(n=50):
+    geoms = [box(i * 10, (i % 7) * 10, i * 10 + 6, (i % 7) * 10 + 4 + i % 3) for i in range(n)]
+    return gpd.GeoDataFrame(
+        {"uID": np.arange(n), "sdbAre": [g.area for g in geoms], "name": ["b" + str(i) for i in range(n)]},
+        geometry=geoms,
+        crs=CRS,
+    )
+
+
+def _rtree(path, layer):
+    con = sqlite3.connect(path)
+    try:
+        return pd.read_sql_query(
+            'SELECT id, minx, maxx, miny, maxy FROM "rtree_{}_geom" ORDER BY id'.format(layer), con
+        )
+    finally:
+        con.close()
+
+
+def _triggers(path, layer):
+    con = sqlite3.connect(path)
+    try:
+        return sorted(con.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (layer,)
+        ).fetchall())
+    finally:
+        con.close()
+
+
+def _assert_rtree(path, layer, gdf):
+    rtree = _rtree(path, layer)
+    assert len(rtree) == len(gdf)
+    # rtree holds float32 bounds rounded outwards
+    bounds = gdf.bounds.values
+    np.testing.assert_allclose(rtree[["minx", "miny", "maxx", "maxy"]].values, bounds, atol=1e-3)
+    assert (rtree.minx.values <= bounds[:, 0]).all() and (rtree.maxx.values >= bounds[:, 2]).all()
+
+
+def test_write_layers(tmp_path):
+    path = str(tmp_path / "case.gpkg")
+    blg = _buildings()
+    edges = gpd.GeoDataFrame({"nID": [0, 1]}, geometry=[LineString([(0, -5), (500, -5)]),
+                                                        LineString([(0, 80), (500, 80)])], crs=CRS)
+    write_layers(path, {"aa_blg": blg, "aa_str": edges})
+
+    assert sorted(fiona.listlayers(path)) == ["aa_blg", "aa_str"]
+    result = gpd.read_file(path, layer="aa_blg")
+    assert result.crs.to_epsg() == 3763
+    pd.testing.assert_frame_equal(pd.DataFrame(result.drop(columns="geometry")),
+                                  pd.DataFrame(blg.drop(columns="geometry")), check_dtype=False)
+    assert result.geometry.geom_equals(blg.geometry).all()
+    _assert_rtree(path, "aa_blg", blg)
+    _assert_rtree(path, "aa_str", edges)
+
+    # replaced layer, other layers are kept
+    write_layers(path, {"aa_blg": blg.iloc[:10]})
+    assert len(gpd.read_file(path, layer="aa_blg")) == 10
+    assert len(gpd.read_file(path, layer="aa_str")) == 2
+    _assert_rtree(path, "aa_blg", blg.iloc[:10])
+
+
+def test_add_columns(tmp_path):
+    path = str(tmp_path / "case.gpkg")
+    blg = _buildings()
+    write_layers(path, {"aa_blg": blg})
+    triggers = _triggers(path, "aa_blg")
+    assert triggers
+
+    stats = pd.DataFrame({"uID": blg.uID[::-1].values, "min": np.linspace(-1, 5, len(blg)),
+                          "count": np.arange(len(blg))})
+    stats.loc[3, "min"] = np.nan
+    add_columns(path, "aa_blg", stats)
+    # overwrite existing column
+    add_columns(path, "aa_blg", pd.DataFrame({"uID": [0], "sdbAre": [-1.0]}))
+
+    result = gpd.read_file(path, layer="aa_blg").set_index("uID")
+    expected = stats.set_index("uID").loc[result.index]
+    np.testing.assert_array_equal(result["min"].values, expected["min"].values)
+    np.testing.assert_array_equal(result["count"].values, expected["count"].values)
+    assert result.loc[0, "sdbAre"] == -1
+    assert result.geometry.geom_equals(blg.set_index("uID").geometry.loc[result.index]).all()
+    pd.testing.assert_frame_equal(read_columns(path, "aa_blg", ["uID", "min"]).set_index("uID"),
+                                  expected[["min"]].loc[read_columns(path, "aa_blg", ["uID"]).uID])
+
+    # triggers maintaining the spatial index are created again as written by GDAL
+    assert _triggers(path, "aa_blg") == triggers
+    _assert_rtree(path, "aa_blg", blg)
+
+
+def test_add_columns_missing(tmp_path):
+    path = str(tmp_path / "case.gpkg")
+    write_layers(path, {"aa_blg": _buildings()})
+    with pytest.raises(ValueError, match="2 values of uID are not present"):
+        add_columns(path, "aa_blg", pd.DataFrame({"uID": [0, 100, 101], "min": [1.0, 2.0, 3.0]}))
+    with pytest.raises(ValueError, match="has no column nID"):
+        add_columns(path, "aa_blg", pd.DataFrame({"nID": [0], "case": [1]}), key="nID")
+    # nothing is written
+    assert "min" not in read_columns(path, "aa_blg").columns
+    assert _triggers(path, "aa_blg")
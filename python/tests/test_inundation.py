@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# test_inundation.py
+# flooding from the sea of synthetic DTMs with a basin not connected to the sea
+
+import os
+
+import geopandas as gpd
+import numpy as np
+import pytest
+import rasterio as rio
+from shapely.geometry import Point, box
+
+from seashore.dtm import source_path
+from seashore.flood import zonal_stats
+from seashore.gpkg import add_columns
+from seashore.inundation import fingerprint, flood_level, inundation_case
+from seashore.synthetic import synthetic_case
+
+
+def test_flood_level():
+    # sea | beach 1 | ridge 3 | basin 0.5 | ridge 3.5 | land 2 (with a gap)
+    dem = np.repeat([[-999, 1, 3, 0.5, 0.5, 3.5, 2, 2]], 5, axis=0)
+    dem[2, 7] = -999
+    sea = np.zeros(dem.shape, dtype=bool)
+    sea[:, 0] = True
+    level = flood_level(dem, sea)
+
+    expected = np.repeat([[np.nan, 1, 3, 3, 3, 3.5, 3.5, 3.5]], 5, axis=0)
+    expected[2, 7] = np.nan
+    np.testing.assert_array_equal(level, expected)
+    # cells flooded at +2 m in the bathtub model, not connected to the sea
+    assert ((dem < 2) & (dem != -999) & (level > 2)).sum() == 10
+
+
+def test_unreachable():
+    dem = np.array([[-999, 1, -999, 1]])
+    level = flood_level(dem, np.array([[True, False, False, False]]))
+    np.testing.assert_array_equal(level, [[np.nan, 1, np.nan, np.inf]])
+
+
+@pytest.fixture
+def case(tmp_path):
+    case, grid = synthetic_case(str(tmp_path), 100)
+    blg = gpd.read_file(case.path, layer=case.name + "_blg")
+    add_columns(case.path, case.name + "_blg", blg[["id"]].assign(uID=blg["id"]), key="id")
+
+    # walled basin (10 m) around the second block, lower than the shore
+    mdt = str(tmp_path / "MDT") + "/"
+    (rpart,) = grid.Id_Unidade
+    with rio.open(source_path(rpart, mdt)) as src:
+        profile = src.meta
+        dem = src.read(1)
+        rows, cols = np.indices(dem.shape)
+        x, y = src.xy(rows, cols)
+    x, y = np.asarray(x), np.asarray(y)
+    outer = (x > 95) & (x < 205) & (y < 105)
+    inner = (x > 105) & (x < 195) & (y > 5) & (y < 95)
+    dem[outer] = 10
+    dem[inner] = 0.5
+    with rio.open(source_path(rpart, mdt), "w", **profile) as dst:
+        dst.write(dem, 1)
+
+    sea = gpd.GeoDataFrame(geometry=[box(-1000, -1000, 2000, -2)], crs=grid.crs)
+    return case, grid, mdt, sea
+
+
+def test_inundation_case(case):
+    case, grid, mdt, sea = case
+    levels = inundation_case(case, grid, sea, mdt=mdt)
+    blg = gpd.read_file(case.path, layer=case.name + "_blg").set_index("uID")
+    levels = levels.set_index("uID").loc[blg.index, "min_conn"]
+
+    with rio.open(source_path(grid.Id_Unidade[0], mdt)) as src:
+        elevation = zonal_stats(blg.geometry, src.read(1), src.transform)["min"]
+    basin = blg.centroid.x.between(100, 200) & (blg.centroid.y < 100)
+    assert basin.sum() == 16
+    np.testing.assert_array_equal(levels[basin], 10)
+    np.testing.assert_array_equal(elevation[basin], 0.5)
+    # water reaches other buildings over land at least as high as the building
+    assert (levels[~basin] >= elevation[~basin]).all()
+    assert (levels[~basin] < 10).all()
+
+
+def test_fingerprint(case):
+    case, grid, mdt, sea = case
+    first = fingerprint(case, grid, sea, mdt=mdt)
+    assert fingerprint(case, grid, sea, mdt=mdt) == first
+    moved = gpd.GeoDataFrame(geometry=[box(-1000, -1000, 2000, -5)], crs=grid.crs)
+    assert fingerprint(case, grid, moved, mdt=mdt) != first
+
+
+def test_not_covered(case):
+    case, grid, mdt, sea = case
+    far = gpd.GeoDataFrame(geometry=[Point(1e5, 1e5).buffer(100)], crs=grid.crs)
+    with pytest.raises(ValueError, match=case.name):
+        inundation_case(case, grid, far, mdt=mdt)
+    moved = grid.assign(geometry=grid.translate(1e5, 1e5))
+    with pytest.raises(ValueError, match=case.name):
+        inundation_case(case, moved, sea, mdt=mdt)
+    assert not os.path.exists(os.path.join(mdt, "cache"))
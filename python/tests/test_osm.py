@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# test_osm.py
+# offline street networks from a small OSM extract with two cases
+
+import geopandas as gpd
+import pytest
+from shapely.geometry import LineString, Point, box
+
+from seashore.osm import _is_drive, clip_network, load_extract
+
+
+@pytest.mark.parametrize(
+    "tags, drive",
+    [
+        ({"highway": "residential"}, True),
+        ({"highway": "primary", "access": "yes"}, True),
+        ({"highway": "residential", "service": "alley"}, True),
+        ({}, False),
+        ({"building": "yes"}, False),
+        ({"highway": "footway"}, False),
+        ({"highway": "service"}, False),
+        # regular expressions are not anchored, as in Overpass
+        ({"highway": "services"}, False),
+        ({"highway": "residential", "access": "private"}, False),
+        ({"highway": "residential", "service": "driveway"}, False),
+        ({"highway": "residential", "motorcar": "no"}, False),
+        ({"highway": "pedestrian", "area": "yes"}, False),
+        ({"highway": "residential", "area": "yes"}, False),
+    ],
+)
+def test_is_drive(tags, drive):
+    assert _is_drive(tags) is drive
+
+
+# (way id, tags, node ids), nodes at lon -9 + i * 0.001, lat 38.7 + j * 0.001
+WAYS = [
+    (1, {"highway": "residential"}, [(0, 0), (5, 0), (10, 0)]),
+    (2, {"highway": "tertiary"}, [(5, 0), (5, 5)]),
+    (3, {"highway": "footway"}, [(0, 0), (0, 5)]),
+    (4, {"highway": "residential", "access": "private"}, [(10, 0), (10, 5)]),
+    # far from the first case, crossing into the second one
+    (5, {"highway": "primary"}, [(100, 0), (110, 0), (120, 0)]),
+    (6, {"highway": "residential"}, [(110, 0), (110, 5)]),
+]
+
+
+def _node(i, j):
+    return 1000 * i + j + 1
+
+
+def _extract(path):
+    nodes = {(i, j) for _, _, refs in WAYS for i, j in refs}
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<osm version="0.6">']
+    for i, j in sorted(nodes):
+        lines.append(
+            '<node id="{}" version="1" lat="{}" lon="{}"/>'.format(
+                _node(i, j), 38.7 + j * 0.001, -9 + i * 0.001
+            )
+        )
+    for way, tags, refs in WAYS:
+        lines.append('<way id="{}" version="1">'.format(way))
+        lines += ['<nd ref="{}"/>'.format(_node(i, j)) for i, j in refs]
+        lines += ['<tag k="{}" v="{}"/>'.format(k, v) for k, v in tags.items()]
+        lines.append("</way>")
+    lines.append("</osm>")
+    with open(path, "w") as f:
+        f.write("\n".join(lines))
+
+
+def test_load_extract(tmp_path):
+    path = str(tmp_path / "extract.osm")
+    _extract(path)
+
+    def _bounds(west, south, east, north):
+        return tuple(
+            gpd.GeoSeries([box(west, south, east, north)], crs="EPSG:4326")
+            .to_crs(epsg=3763)
+            .total_bounds
+        )
+
+    bounds = {
+        "first": _bounds(-9.0005, 38.6995, -8.9895, 38.7055),
+        "second": _bounds(-8.8905, 38.6995, -8.8895, 38.7055),
+        "empty": _bounds(-8.5, 38.5, -8.4, 38.6),
+    }
+    networks = load_extract(path, bounds)
+    assert set(networks) == set(bounds)
+    assert networks["empty"].empty
+
+    # drivable ways with a node within bounds, kept whole
+    lines = gpd.GeoSeries(
+        {
+            way: LineString([(-9 + i * 0.001, 38.7 + j * 0.001) for i, j in refs])
+            for way, _, refs in WAYS
+        },
+        crs="EPSG:4326",
+    ).to_crs(epsg=3763)
+    for key, ways in [("first", [1, 2]), ("second", [5, 6])]:
+        edges = networks[key]
+        assert edges.crs == lines.crs
+        assert set(edges.osmid) == set(ways)
+        assert edges.sindex is not None
+        assert abs(edges.length.sum() - lines[ways].length.sum()) < 1e-6
+
+    blg = gpd.GeoDataFrame(
+        geometry=[Point(b[:2]).buffer(5) for b in [bounds["second"]]], crs="EPSG:3763"
+    )
+    assert clip_network(networks["empty"], blg).empty
+    assert not clip_network(networks["second"], blg, 100).empty
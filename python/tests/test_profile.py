@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# test_profile.py
+# street_profile on streets with known profiles and compared to momepy (v0.1.1)
+
+import geopandas as gpd
+import momepy as mm
+import numpy as np
+import pytest
+from shapely.geometry import LineString, box
+
+from seashore.profile import street_profile
+
+
+def _assert_momepy(edges, buildings, distance):
+    expected = mm.StreetProfile(edges, buildings, distance=distance)
+    result = street_profile(edges, buildings, distance=distance)
+    np.testing.assert_allclose(result.w.values, expected.w.values, rtol=1e-9)
+    np.testing.assert_allclose(result.wd.values, expected.wd.values, rtol=1e-9, atol=1e-10)
+    np.testing.assert_allclose(result.o.values, expected.o.values, rtol=1e-9)
+
+
+def test_known_profile():
+    edges = gpd.GeoDataFrame(
+        geometry=[
+            # continuous walls 5 m to the left and 7 m to the right, buildings
+            # are deeper than ticks (a tick crossing walls twice counts as right)
+            LineString([(0, 0), (100, 0)]),
+            # walls only 4 m to the left
+            LineString([(0, 100), (100, 100)]),
+            # no buildings
+            LineString([(0, 300), (100, 300)]),
+        ]
+    )
+    buildings = gpd.GeoDataFrame(
+        geometry=[box(-10, 5, 110, 40), box(-10, -40, 110, -7), box(-10, 104, 110, 140)]
+    )
+    result = street_profile(edges, buildings, distance=10, tick_length=50)
+
+    np.testing.assert_allclose(result.w.values, [12, 4 + 25, 50])
+    np.testing.assert_allclose(result.wd.values, [1, 0, 0], atol=1e-12)
+    np.testing.assert_allclose(result.o.values, [0, 0.5, 1])
+
+
+def test_repeated_vertex():
+    buildings = gpd.GeoDataFrame(geometry=[box(-10, 5, 110, 40), box(-10, -40, 110, -7)])
+    line = [(0, 0), (40, 0), (100, 0)]
+    repeated = [(0, 0), (40, 0), (40, 0), (100, 0), (100, 0)]
+    expected = street_profile(gpd.GeoDataFrame(geometry=[LineString(line)]), buildings)
+    result = street_profile(gpd.GeoDataFrame(geometry=[LineString(repeated)]), buildings)
+    assert result.notna().all(axis=None)
+    np.testing.assert_allclose(result.values, expected.values)
+
+
+@pytest.fixture
+def case():
+    rng = np.random.default_rng(0)
+    edges = gpd.GeoDataFrame(
+        geometry=[
+            LineString([(0, 0), (100, 0)]),
+            LineString([(100, 0), (180, 40)]),
+            LineString([(0, 0), (0, 80), (20, 120)]),
+            # buildings only on one side
+            LineString([(0, -40), (100, -40)]),
+            # no buildings
+            LineString([(300, 300), (350, 300)]),
+            # shorter than the distance between ticks
+            LineString([(100, 0), (104, -3)]),
+        ]
+    )
+    geoms = []
+    # walls are offset from ticks, collinear walls are not handled by momepy
+    for x in np.arange(5.3, 95, 12):
+        # both sides of the first street at varying setbacks
+        for side in (1, -1):
+            setback = rng.uniform(4, 15)
+            y = setback if side == 1 else -setback - 10
+            geoms.append(box(x, y, x + 10, y + 10))
+    for y in np.arange(10.3, 75, 15):
+        geoms.append(box(6, y, 14, y + 10))
+        geoms.append(box(-20, y, -8, y + 8))
+    # building crossed twice by ticks
+    geoms.append(box(120.3, 30, 140.3, 60).difference(box(125.3, 35, 135.3, 55)))
+    buildings = gpd.GeoDataFrame(geometry=geoms, index=np.arange(len(geoms)) * 3 + 7)
+    return edges, buildings
+
+
+@pytest.mark.parametrize("distance", [3, 10])
+def test_momepy(case, distance):
+    _assert_momepy(*case, distance)
+
+
+def test_momepy_mixed_lengths():
+    rng = np.random.default_rng(1)
+    edges = gpd.GeoDataFrame(
+        geometry=[
+            # long street with a bend, bounds cover most buildings
+            LineString([(0, 0), (1500, 0), (2000, 700)]),
+            LineString([(500, 0), (500, 6)]),
+            LineString([(700.5, -30), (700.5, 30)]),
+            LineString([(1200, 0), (1203, 2), (1210, 2)]),
+        ]
+    )
+    geoms = []
+    for x in rng.uniform(0, 1480, 150):
+        setback = rng.uniform(3, 20)
+        side = rng.choice([1, -1])
+        y = setback if side == 1 else -setback - 8
+        geoms.append(box(x + 0.3, y, x + 8.3, y + 8))
+    buildings = gpd.GeoDataFrame(geometry=geoms)
+    _assert_momepy(edges, buildings, 10)
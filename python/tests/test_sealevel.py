@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# test_sealevel.py
+# sea level sweep of a stored case compared to flood risk of waterrelation_data.csv
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import Point
+
+from seashore.gpkg import write_layers
+from seashore.runner import Case
+from seashore.sealevel import LEVELS, below, sweep_case
+from seashore.waterrelation import waterrelation_case
+
+
+def test_below():
+    values = [1, 3, np.nan, 2, 5]
+    np.testing.assert_allclose(below(values, [0, 2, 2.5, 6]), [0, 0.2, 0.4, 0.8])
+    weights = [1, 1, 2, 1, 5]
+    np.testing.assert_allclose(below(values, [2, 10], weights), [0.1, 0.8])
+    assert np.isnan(below(values, [1], np.zeros(5))).all()
+
+
+def test_waterrelation(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 60
+    elevation = rng.uniform(0, 10, n)
+    # levels of the sweep as elevation
+    elevation[:5] = [5, 4.9, 5.1, 0.5, 10]
+    # missing elevation in the original data and buildings without pixels
+    elevation[5:8] = -999
+    elevation[8:10] = np.nan
+    uid = np.arange(n)
+    blg = gpd.GeoDataFrame(
+        {
+            "uID": uid,
+            "part": np.repeat([0, 1, 2], n // 3),
+            "min": elevation,
+            "sdbAre": rng.uniform(50, 200, n),
+        },
+        geometry=[Point(i, 0).buffer(0.4) for i in range(n)],
+    )
+    tess = gpd.GeoDataFrame(
+        {"uID": uid, "main": (uid % 4 == 0).astype(int)},
+        geometry=[Point(i, 0).buffer(0.5) for i in range(n)],
+    )
+    case = Case("atlantic", str(tmp_path / "atlantic.gpkg"), "test")
+    write_layers(case.path, {"test_blg": blg, "test_tess": tess})
+
+    sweep = sweep_case(case)
+    assert len(sweep) == 3 * len(LEVELS)
+    rows, _ = waterrelation_case(case, level=5)
+    at_five = sweep[sweep.level == 5].set_index("case")
+    np.testing.assert_allclose(
+        at_five.loc[rows.index, "buildings"].values, rows["flooded_perc"].values
+    )
+    # -999 counts as flooded in both, NaN in neither
+    flooded = (elevation < 5).sum()
+    assert np.isclose(at_five["buildings"].mean(), flooded / n)
+
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# test_shape.py
+# shape_characters of simple polygons and compared to momepy (v0.1.1)
+
+import geopandas as gpd
+import momepy as mm
+import numpy as np
+import pytest
+from shapely.affinity import rotate
+from shapely.geometry import MultiPolygon, Polygon, box
+
+from seashore.shape import COLUMNS, shape_characters
+
+
+def test_known_characters():
+    geoms = gpd.GeoSeries(
+        [box(0, 0, 1, 1), box(0, 0, 2, 1), box(0, 0, 4, 4).difference(box(1, 1, 3, 3))]
+    )
+    expected = {
+        "area": [1, 2, 12],
+        "perimeter": [4, 6, 24],
+        # area over the area of the enclosing circle
+        "circular_compactness": [2 / np.pi, 8 / (5 * np.pi), 12 / (8 * np.pi)],
+        "corners": [4, 4, 4],
+        "squareness": [0, 0, 0],
+        # courtyard: sqrt(12 / 16) * 16 / 24
+        "eri": [1, 1, np.sqrt(3) / 3],
+        "elongation": [1, 0.5, 1],
+        "centroid_corners": [np.sqrt(2) / 2, np.sqrt(5) / 2, 2 * np.sqrt(2)],
+        "longest_axis": [np.sqrt(2), np.sqrt(5), 4 * np.sqrt(2)],
+    }
+    shape = shape_characters(geoms)
+    assert list(shape.columns) == COLUMNS
+    for column, values in expected.items():
+        np.testing.assert_allclose(shape[column].values, values, rtol=1e-12, atol=1e-12)
+
+
+@pytest.fixture
+def buildings():
+    # building-like outlines: random hulls often have several minimum rotated
+    # rectangles of equal area, which makes eri and elongation ambiguous
+    rng = np.random.default_rng(0)
+    geoms = []
+    for i in range(30):
+        x, y = i % 6 * 30, i // 6 * 30
+        w, h = rng.uniform(5, 20, 2)
+        geom = box(x, y, x + w, y + h)
+        if i % 3 == 1:
+            # L-shaped building
+            geom = geom.difference(box(x + w / 2, y + h / 2, x + w, y + h))
+        elif i % 3 == 2:
+            # gabled outline with a skewed side
+            geom = Polygon([(x, y), (x + w, y), (x + w + 2, y + h), (x + w / 3, y + h + 4),
+                            (x, y + h)])
+        geoms.append(rotate(geom, rng.uniform(0, 90), origin="centroid"))
+    # courtyard
+    geoms.append(box(200, 0, 220, 20).difference(box(205, 5, 215, 15)))
+    return gpd.GeoDataFrame({"uID": range(len(geoms))}, geometry=geoms)
+
+
+@pytest.mark.parametrize(
+    "column, character",
+    [
+        ("area", lambda gdf: mm.Area(gdf).series),
+        ("perimeter", lambda gdf: mm.Perimeter(gdf).series),
+        ("circular_compactness", lambda gdf: mm.CircularCompactness(gdf, "area").series),
+        ("corners", lambda gdf: mm.Corners(gdf).series),
+        ("squareness", lambda gdf: mm.Squareness(gdf).series),
+        ("eri", lambda gdf: mm.EquivalentRectangularIndex(gdf, "area", "perimeter").series),
+        ("elongation", lambda gdf: mm.Elongation(gdf).series),
+        ("centroid_corners", lambda gdf: mm.CentroidCorners(gdf).mean),
+        ("longest_axis", lambda gdf: mm.LongestAxisLength(gdf).series),
+    ],
+)
+def test_momepy(buildings, column, character):
+    buildings["area"] = buildings.area
+    buildings["perimeter"] = buildings.length
+    expected = character(buildings)
+    result = shape_characters(buildings.geometry)[column]
+    np.testing.assert_allclose(result.values, expected.values, rtol=1e-9, atol=1e-10)
+
+
+def test_multipolygon():
+    geoms = gpd.GeoSeries([MultiPolygon([box(0, 0, 1, 1), box(2, 0, 3, 1)])], index=[5])
+    shape = shape_characters(geoms)
+    assert list(shape.index) == [5]
+    assert shape.loc[5, "area"] == 2
+    assert np.isnan(shape.loc[5, ["corners", "squareness", "centroid_corners"]]).all()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# test_tessellation.py
+# tiled_tessellation compared to monolithic momepy.Tessellation (v0.1.1)
+
+import geopandas as gpd
+import momepy as mm
+import numpy as np
+from shapely.geometry import box
+
+from seashore import tessellation
+from seashore.tessellation import tiled_tessellation
+
+
+def test_monolithic(monkeypatch):
+    # rectangles in 20 m plots of 100 m blocks, 7 x 2 blocks
+    rng = np.random.default_rng(0)
+    x, y = np.meshgrid(np.arange(0, 700, 20), np.arange(0, 200, 20))
+    plots = (x % 100 < 80) & (y % 100 < 80)
+    x, y = x[plots][:200] + 10, y[plots][:200] + 10
+    width, height = rng.uniform(6, 18, (2, len(x)))
+    x, y = x + rng.uniform(0, 20 - width), y + rng.uniform(0, 20 - height)
+    buildings = gpd.GeoDataFrame(
+        {"uID": np.arange(len(x))},
+        geometry=[box(*b) for b in zip(x, y, x + width, y + height)],
+    )
+    limit = box(0, 0, 700, 200)
+
+    tiles = []
+    tessellate_tile = tessellation._tessellate_tile
+
+    def _counted(*args):
+        tiles.append(len(args[0]))
+        return tessellate_tile(*args)
+
+    monkeypatch.setattr(tessellation, "_tessellate_tile", _counted)
+
+    # coarser segments than default to keep the test fast
+    expected = mm.Tessellation(buildings, "uID", limit=limit, segment=2).tessellation
+    # small tiles and buffer leave unstable cells, which are re-tessellated
+    result = tiled_tessellation(buildings, "uID", limit, tile_size=250, buffer=20, segment=2)
+    minx, miny, maxx, maxy = limit.bounds
+    n_tiles = np.ceil((maxx - minx) / 250) * np.ceil((maxy - miny) / 250)
+    assert len(tiles) > n_tiles
+
+    expected = expected.set_index("uID").sort_index()
+    result = result.set_index("uID")
+    assert set(result.index) == set(expected.index)
+    assert len(result) == len(expected)
+    np.testing.assert_allclose(
+        result.loc[expected.index].area.values, expected.area.values, rtol=1e-9
+    )